@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import ghostty_perf_report as report
+
+REPORT_SCRIPT = Path(__file__).resolve().with_name("ghostty_perf_report.py")
+
+# Relative to a fake $HOME, matching ghostty_perf_report.main().
+PERF_LOG = ".local/state/nvim/humoodagen-perf.log"
+LAUNCH_LOG = ".local/state/humoodagen/ghostty-launch.log"
+SHELL_LOG = ".local/state/humoodagen/toggleterm-shell.log"
+
+PARSERS: dict[str, tuple[str, type]] = {
+    "perf": (PERF_LOG, report.PerfLogIndex),
+    "launch": (LAUNCH_LOG, report.LaunchLogIndex),
+    "shell": (SHELL_LOG, report.ShellLogIndex),
+}
+
+PLUGINS = ("telescope", "treesitter", "lsp", "gitsigns", "oil", "harpoon", "noice", "mini", "flash", "trouble")
+
+
+def parse_size(value: str) -> int:
+    m = re.fullmatch(r"(?i)\s*(\d+(?:\.\d+)?)\s*([kmg]?)b?\s*", value)
+    if not m:
+        raise argparse.ArgumentTypeError(f"invalid size: {value!r}")
+    return int(float(m.group(1)) * {"": 1, "k": 1 << 10, "m": 1 << 20, "g": 1 << 30}[m.group(2).lower()])
+
+
+def fmt_size(n: int) -> str:
+    for unit, scale in (("GB", 1 << 30), ("MB", 1 << 20), ("KB", 1 << 10)):
+        if n >= scale:
+            return f"{round(n / scale, 1):g}{unit}"
+    return f"{n}B"
+
+
+def malformed_line(rnd: random.Random, line: str) -> str:
+    kind = rnd.randrange(3)
+    if kind == 0:
+        return line[: rnd.randrange(1, max(2, len(line) - 1))].rstrip("\n") + "\n"
+    if kind == 1:
+        return "garbage | " + "x" * rnd.randrange(1, 40) + "\n"
+    return "NaNms | " + line
+
+
+def generate_logs(
+    home: Path,
+    *,
+    target_bytes: int | None,
+    launches: int | None,
+    events_per_launch: int,
+    malformed_ratio: float,
+    seed: int,
+) -> dict[str, int]:
+    """Write synthetic perf/launch/shell logs under `home` until `target_bytes` or `launches` is reached.
+
+    Timestamps are causal (launcher → tmux → nvim → toggleterm → zsh), so every
+    report mode has realistic input; `events_per_launch` pads each perf section with
+    lazy.nvim-style markers.
+    """
+    rnd = random.Random(seed)
+    paths = {name: home / rel for name, (rel, _index) in PARSERS.items()}
+    for path in paths.values():
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+    written = {"launches": 0, "bytes": 0, "lines": 0}
+    launch_ts_ns = 1_700_000_000_000_000_000
+    with (
+        paths["perf"].open("w", encoding="utf-8") as perf,
+        paths["launch"].open("w", encoding="utf-8") as launch,
+        paths["shell"].open("w", encoding="utf-8") as shell,
+    ):
+        files = {"perf": perf, "launch": launch, "shell": shell}
+
+        def emit(name: str, line: str) -> None:
+            if malformed_ratio and rnd.random() < malformed_ratio:
+                line = malformed_line(rnd, line)
+            files[name].write(line)
+            written["bytes"] += len(line)
+            written["lines"] += 1
+
+        while True:
+            if launches is not None and written["launches"] >= launches:
+                break
+            if target_bytes is not None and written["bytes"] >= target_bytes:
+                break
+            launch_ts_ns += rnd.randint(30, 3600) * 1_000_000_000
+            L = launch_ts_ns
+            ms = lambda lo, hi: rnd.uniform(lo, hi) * 1e6  # noqa: E731
+
+            t = L
+            emit("launch", f"{t} | launcher:start | launch_ts_ns={L}\n")
+            emit("launch", f"{t} | launcher:open_to_launcher | launch_ts_ns={L} delta_ns={int(ms(5, 30))}\n")
+            emit("launch", f"{t} | launcher:tmux_impl={rnd.choice(('tmux', 'tmux-next'))} | launch_ts_ns={L}\n")
+            t += int(ms(1, 5))
+            emit("launch", f"{t} | launcher:exec-tmux | launch_ts_ns={L}\n")
+            t += int(ms(5, 20))
+            emit("launch", f"{t} | tmux:client-attached | launch_ts_ns={L}\n")
+            t += int(ms(1, 5))
+            emit("launch", f"{t} | tmux:cmd:start | launch_ts_ns={L}\n")
+
+            init_launch_ms = (t - L) / 1e6 + rnd.uniform(1, 5)
+            since_start = rnd.uniform(0.2, 1.0)
+            emit("perf", f"=== 2024-01-01 00:00:00 pid={rnd.randint(1000, 99999)} nvim=0.10.2 launch_ts_ns={L} ===\n")
+
+            def mark(label: str, extra: str = "") -> float:
+                line = f"{since_start:9.2f}ms | {label} | launch={init_launch_ms + since_start:9.2f}ms"
+                emit("perf", line + (f" | {extra}\n" if extra else "\n"))
+                return init_launch_ms + since_start
+
+            mark("perf enabled", "argv=nvim --embed")
+            pad = max(0, events_per_launch - 14)
+            for i in range(pad):
+                since_start += rnd.uniform(0.05, 40.0 / max(pad, 1))
+                mark(f"lazy:load:{PLUGINS[i % len(PLUGINS)]}", f"n={i}")
+            for label, lo, hi in (
+                ("User LazyDone", 5, 20),
+                ("VimEnter", 5, 20),
+                ("UIEnter", 1, 5),
+                ("nvim-tree:open:start", 1, 5),
+                ("nvim-tree:open:done", 5, 30),
+                ("toggleterm:startup:open_horizontal_in_win:begin", 1, 3),
+                ("toggleterm:startup:open_horizontal_in_win:done", 5, 15),
+                ("toggleterm:term:spawn:begin", 1, 3),
+            ):
+                since_start += rnd.uniform(lo, hi)
+                mark(label)
+            spawn_begin_ms = init_launch_ms + since_start
+
+            s = L + int(spawn_begin_ms * 1e6)
+            shell_pid = rnd.randint(1000, 99999)
+            for event, lo, hi in (
+                ("toggleterm:zshenv:begin", 1, 3),
+                ("toggleterm:zshenv:source_home:begin", 0.1, 1),
+                ("toggleterm:zshenv:source_home:done", 1, 5),
+                ("toggleterm:zshenv:end", 0.1, 1),
+                ("toggleterm:zshrc:begin", 1, 3),
+                ("toggleterm:zshrc:end_fast_init", 3, 10),
+                ("toggleterm:prompt:first", 1, 5),
+            ):
+                s += int(ms(lo, hi))
+                emit("shell", f"{s} | {event} | launch_ts_ns={L} | pid={shell_pid} | ppid={shell_pid - 1}\n")
+            prompt_ms = (s - L) / 1e6
+
+            since_start += rnd.uniform(3, 10)
+            mark("toggleterm:term:spawn:done")
+            since_start += rnd.uniform(0.5, 2)
+            mark("toggleterm:startup:done")
+            since_start = max(since_start, prompt_ms - init_launch_ms) + rnd.uniform(0.5, 2)
+            mark("toggleterm:stdout:first")
+            written["launches"] += 1
+    return written
+
+
+def max_rss_bytes(ru_maxrss: int) -> int:
+    # Linux reports KiB, macOS bytes.
+    return ru_maxrss if sys.platform == "darwin" else ru_maxrss * 1024
+
+
+def measure_parser(name: str, path: Path) -> dict[str, float]:
+    """Run one parser over `path` in this process (called in a fresh child for a clean peak RSS)."""
+    import resource
+
+    _rel, index_type = PARSERS[name]
+    t0 = time.perf_counter()
+    report.scan_log(path, index_type())
+    seconds = time.perf_counter() - t0
+    lines = 0
+    with path.open("rb") as f:
+        while chunk := f.read(1 << 20):
+            lines += chunk.count(b"\n")
+    return {
+        "seconds": seconds,
+        "bytes": path.stat().st_size,
+        "lines": lines,
+        "max_rss": max_rss_bytes(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss),
+    }
+
+
+def run_child(cmd: list[str], env: dict[str, str] | None = None) -> tuple[float, int, bytes]:
+    """Wall time, peak RSS and stdout of one child process."""
+    t0 = time.perf_counter()
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, env=env)
+    out = proc.stdout.read() if proc.stdout else b""
+    _pid, status, usage = os.wait4(proc.pid, 0)
+    seconds = time.perf_counter() - t0
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    if proc.returncode != 0:
+        raise RuntimeError(f"{' '.join(cmd)} exited with {proc.returncode}")
+    return seconds, max_rss_bytes(usage.ru_maxrss), out
+
+
+def bench_size(home: Path, repeat: int, jobs: int = 1) -> dict[str, dict[str, float]]:
+    results: dict[str, dict[str, float]] = {}
+    for name, (rel, _index) in PARSERS.items():
+        runs = []
+        for _ in range(repeat):
+            _s, _rss, out = run_child([sys.executable, __file__, "_measure", name, str(home / rel)])
+            runs.append(json.loads(out))
+        best = min(runs, key=lambda r: r["seconds"])
+        results[name] = {
+            "lines_per_sec": best["lines"] / best["seconds"] if best["seconds"] else 0.0,
+            "mb_per_sec": best["bytes"] / (1 << 20) / best["seconds"] if best["seconds"] else 0.0,
+            "max_rss": max(r["max_rss"] for r in runs),
+            "seconds": best["seconds"],
+        }
+
+    env = {**os.environ, "HOME": str(home)}
+    runs = [run_child([sys.executable, str(REPORT_SCRIPT), "--no-cache"], env) for _ in range(repeat)]
+    results["report"] = {"seconds": min(r[0] for r in runs), "max_rss": max(r[1] for r in runs)}
+    if jobs != 1:
+        cmd = [sys.executable, str(REPORT_SCRIPT), "--no-cache", "--jobs", str(jobs)]
+        runs = [run_child(cmd, env) for _ in range(repeat)]
+        results["report_jobs"] = {
+            "jobs": jobs,
+            "cpus": os.cpu_count() or 1,
+            "seconds": min(r[0] for r in runs),
+            "max_rss": max(r[1] for r in runs),
+        }
+    return results
+
+
+def print_results(label: str, results: dict[str, dict[str, float]], baseline: dict[str, dict[str, float]] | None) -> None:
+    print(f"\n**{label}**")
+    for name in PARSERS:
+        r = results[name]
+        line = (
+            f"- {name}: {r['lines_per_sec']:,.0f} lines/s, {r['mb_per_sec']:.1f} MB/s, "
+            f"peak RSS {fmt_size(int(r['max_rss']))}"
+        )
+        base = (baseline or {}).get(name)
+        if base and base.get("lines_per_sec"):
+            line += f" ({r['lines_per_sec'] / base['lines_per_sec']:.2f}x baseline)"
+        print(line)
+    r = results["report"]
+    line = f"- report end-to-end: {r['seconds'] * 1e3:.1f}ms, peak RSS {fmt_size(int(r['max_rss']))}"
+    base = (baseline or {}).get("report")
+    if base and base.get("seconds"):
+        line += f" ({r['seconds'] / base['seconds']:.2f}x baseline latency)"
+    print(line)
+    p = results.get("report_jobs")
+    if p:
+        print(
+            f"- report end-to-end with --jobs {p['jobs']} ({p['cpus']} CPUs): {p['seconds'] * 1e3:.1f}ms, "
+            f"peak RSS {fmt_size(int(p['max_rss']))} ({r['seconds'] / p['seconds']:.2f}x speedup over serial)"
+        )
+
+
+def prepare_data(data_dir: Path, target_bytes: int, args: argparse.Namespace) -> Path:
+    """Generate (or reuse, if the parameters match) a synthetic $HOME of about `target_bytes`."""
+    home = data_dir / fmt_size(target_bytes)
+    params = {
+        "target_bytes": target_bytes,
+        "events_per_launch": args.events_per_launch,
+        "malformed_ratio": args.malformed_ratio,
+        "seed": args.seed,
+    }
+    manifest = home / "manifest.json"
+    try:
+        if json.loads(manifest.read_text(encoding="utf-8")).get("params") == params:
+            return home
+    except (FileNotFoundError, ValueError):
+        pass
+    shutil.rmtree(home, ignore_errors=True)
+    written = generate_logs(
+        home,
+        target_bytes=target_bytes,
+        launches=None,
+        events_per_launch=args.events_per_launch,
+        malformed_ratio=args.malformed_ratio,
+        seed=args.seed,
+    )
+    manifest.write_text(json.dumps({"params": params, "written": written}, indent=2) + "\n", encoding="utf-8")
+    return home
+
+
+def main(argv: list[str]) -> int:
+    if argv[:1] == ["_measure"]:
+        print(json.dumps(measure_parser(argv[1], Path(argv[2]))))
+        return 0
+
+    parser = argparse.ArgumentParser(description="Synthetic logs and throughput benchmarks for ghostty_perf_report.py.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    def add_shape_args(p: argparse.ArgumentParser) -> None:
+        p.add_argument("--events-per-launch", type=int, default=40, help="perf log lines per launch (default: 40)")
+        p.add_argument("--malformed-ratio", type=float, default=0.01, help="fraction of corrupted lines (default: 0.01)")
+        p.add_argument("--seed", type=int, default=1)
+
+    gen = sub.add_parser("generate", help="write synthetic logs under a fake $HOME")
+    gen.add_argument("home", type=Path, help="directory to use as $HOME (logs go under .local/state/)")
+    size = gen.add_mutually_exclusive_group(required=True)
+    size.add_argument("--launches", type=int, default=None)
+    size.add_argument("--size", type=parse_size, default=None, help="approximate total size, e.g. 100MB")
+    add_shape_args(gen)
+
+    run = sub.add_parser("run", help="benchmark the log parsers and the end-to-end report")
+    run.add_argument(
+        "--sizes",
+        type=lambda v: [parse_size(x) for x in v.split(",")],
+        default=[10 << 20, 100 << 20, 1 << 30],
+        help="comma-separated total log sizes (default: 10MB,100MB,1GB)",
+    )
+    run.add_argument("--repeat", type=int, default=3, help="runs per measurement; best time is kept (default: 3)")
+    run.add_argument(
+        "--jobs", type=int, default=1, help="also time the report with --jobs N (0 = one per CPU; default: serial only)"
+    )
+    run.add_argument("--data-dir", type=Path, default=None, help="keep generated logs here and reuse them across runs")
+    run.add_argument("--baseline", type=Path, default=None, help="compare against results saved with --save")
+    run.add_argument("--save", type=Path, default=None, help="write results as JSON (usable as a later --baseline)")
+    add_shape_args(run)
+
+    args = parser.parse_args(argv)
+
+    if args.command == "generate":
+        home = args.home.expanduser()
+        written = generate_logs(
+            home,
+            target_bytes=args.size,
+            launches=args.launches,
+            events_per_launch=args.events_per_launch,
+            malformed_ratio=args.malformed_ratio,
+            seed=args.seed,
+        )
+        print(f"Wrote: {home} ({written['launches']} launches, {written['lines']} lines, {fmt_size(written['bytes'])})")
+        return 0
+
+    baseline = json.loads(args.baseline.expanduser().read_text(encoding="utf-8")) if args.baseline else {}
+    tmp = None if args.data_dir else tempfile.mkdtemp(prefix="ghostty-perf-bench-")
+    data_dir = args.data_dir.expanduser() if args.data_dir else Path(tmp)
+    results: dict[str, dict[str, dict[str, float]]] = {}
+    try:
+        for target in args.sizes:
+            label = fmt_size(target)
+            home = prepare_data(data_dir, target, args)
+            results[label] = bench_size(home, args.repeat, args.jobs)
+            print_results(label, results[label], baseline.get(label))
+    finally:
+        if tmp:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    if args.save:
+        args.save.expanduser().write_text(json.dumps(results, indent=2) + "\n", encoding="utf-8")
+        print(f"\nWrote: {args.save}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
@@ -2,10 +2,25 @@
 from __future__ import annotations
 
 import argparse
+import bisect
+import csv
+import hashlib
+import json
+import math
+import mmap
 import os
+import pickle
+import random
 import re
-from dataclasses import dataclass
+import sys
+import time
+from array import array
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
 from pathlib import Path
+from typing import BinaryIO, TextIO, Union
 
 
 @dataclass(frozen=True)
@@ -16,138 +31,499 @@ class PerfEvent:
     extra: str
 
 
-def read_latest_launch_ts_ns_from_launch_log(launch_log: Path) -> int | None:
-    last: int | None = None
-    needle = "| launcher:start |"
-    ts_re = re.compile(r"launch_ts_ns=(\d+)")
-    try:
-        with launch_log.open("r", encoding="utf-8", errors="replace") as f:
-            for raw in f:
-                line = raw.rstrip("\n")
-                if needle not in line:
-                    continue
-                m = ts_re.search(line)
-                if m:
-                    last = int(m.group(1))
-    except FileNotFoundError:
-        return None
-    return last
+LAUNCH_TS_RE = re.compile(r"launch_ts_ns=(\d+)")
+DELTA_NS_RE = re.compile(r"delta_ns=(\d+)")
+TMUX_IMPL_RE = re.compile(r"launcher:tmux_impl=([^ ]+)")
 
 
-def read_latest_launch_ts_ns(perf_log: Path) -> int | None:
-    last: int | None = None
-    header_re = re.compile(r"launch_ts_ns=(\d+)")
+def parse_perf_line(line: str) -> PerfEvent | None:
+    parts = [p.strip() for p in line.split("|")]
+    if len(parts) < 3:
+        return None
+    if not parts[0].endswith("ms"):
+        return None
+    if not parts[2].startswith("launch="):
+        return None
     try:
-        with perf_log.open("r", encoding="utf-8", errors="replace") as f:
-            for line in f:
-                if not line.startswith("=== "):
-                    continue
-                m = header_re.search(line)
-                if m:
-                    last = int(m.group(1))
-    except FileNotFoundError:
+        ms_since_start = float(parts[0].removesuffix("ms").strip())
+        label = parts[1]
+        launch_ms = float(parts[2].split("=", 1)[1].removesuffix("ms").strip())
+    except Exception:
         return None
-    return last
+    extra = " | ".join(parts[3:]).strip()
+    return PerfEvent(ms_since_start=ms_since_start, label=label, launch_ms=launch_ms, extra=extra)
+
+
+def new_span(spans: dict[int, list[int]], launch_ts_ns: int, offset: int) -> None:
+    """Extend the [first, last] line offsets of `launch_ts_ns` to the line at `offset`."""
+    span = spans.get(launch_ts_ns)
+    if span is None:
+        spans[launch_ts_ns] = [offset, offset]
+    else:
+        span[1] = offset
+
+
+def merge_spans(spans: dict[int, list[int]], later: dict[int, list[int]]) -> None:
+    for k, (first, last) in later.items():
+        span = spans.get(k)
+        if span is None:
+            spans[k] = [first, last]
+        else:
+            span[1] = last
+
+
+def pack_spans(spans: dict[int, list[int]]) -> tuple[array, array, array]:
+    """Spans as three int64 columns: they pickle as raw bytes, so the cache loads in one copy."""
+    return (
+        array("q", spans),
+        array("q", (span[0] for span in spans.values())),
+        array("q", (span[1] for span in spans.values())),
+    )
+
+
+def unpack_spans(packed: tuple[array, array, array]) -> dict[int, list[int]]:
+    launches, firsts, lasts = packed
+    return {k: [first, last] for k, first, last in zip(launches, firsts, lasts)}
+
+
+@dataclass
+class PerfLogIndex:
+    """Every `=== ... launch_ts_ns=N ===` section of humoodagen-perf.log, keyed by N.
 
+    `spans` holds the offsets of each launch's first and last line. Launches in
+    `unloaded` (restored from the cache or indexed by a worker process) have spans but
+    no events; those are re-read from `path` when first asked for (see `reload_launches`).
+    """
 
-def parse_perf_section(perf_log: Path, launch_ts_ns: int) -> list[PerfEvent]:
-    events: list[PerfEvent] = []
-    header_re = re.compile(r"launch_ts_ns=(\d+)")
-    in_section = False
+    events: dict[int, list[PerfEvent]] = field(default_factory=dict)
+    spans: dict[int, list[int]] = field(default_factory=dict)
+    latest: int | None = None
+    current: int | None = None
+    path: Path | None = None
+    unloaded: set[int] = field(default_factory=set)
+
+    def feed(self, line: str, offset: int) -> int | None:
+        """Index one line; returns the launch_ts_ns it added to, if any."""
+        if line.startswith("=== "):
+            m = LAUNCH_TS_RE.search(line)
+            self.current = int(m.group(1)) if m else None
+            if self.current is not None:
+                self.latest = self.current
+                new_span(self.spans, self.current, offset)
+                self.events.setdefault(self.current, [])
+            return self.current
+        if self.current is None:
+            return None
+        ev = parse_perf_line(line)
+        if ev is None:
+            return None
+        # setdefault: a section restored from the cache has no events in memory.
+        self.events.setdefault(self.current, []).append(ev)
+        new_span(self.spans, self.current, offset)
+        return self.current
+
+    def to_cache(self) -> dict:
+        return {"spans": pack_spans(self.spans), "latest": self.latest, "current": self.current}
+
+    @classmethod
+    def from_cache(cls, state: dict, path: Path) -> PerfLogIndex:
+        spans = unpack_spans(state["spans"])
+        return cls(spans=spans, latest=state["latest"], current=state["current"], path=path, unloaded=set(spans))
+
+    def merge(self, later: PerfLogIndex) -> None:
+        """Fold in the index of the bytes that follow this one's; `later` must start at a `=== ` header."""
+        for k, v in later.events.items():
+            self.events.setdefault(k, []).extend(v)
+        merge_spans(self.spans, later.spans)
+        self.unloaded |= later.unloaded
+        if later.latest is not None:
+            self.latest = later.latest
+        self.current = later.current
+
+
+@dataclass
+class LaunchLogIndex:
+    """Launcher/tmux markers from ghostty-launch.log, keyed by launch_ts_ns."""
+
+    events: dict[int, dict[str, float | int | str]] = field(default_factory=dict)
+    spans: dict[int, list[int]] = field(default_factory=dict)
+    latest: int | None = None
+    path: Path | None = None
+    unloaded: set[int] = field(default_factory=set)
+
+    def feed(self, line: str, offset: int) -> int | None:
+        m = LAUNCH_TS_RE.search(line)
+        if not m:
+            return None
+        launch_ts_ns = int(m.group(1))
+        if "| launcher:start |" in line:
+            self.latest = launch_ts_ns
+        new_span(self.spans, launch_ts_ns, offset)
+        out = self.events.setdefault(launch_ts_ns, {})
+        # Leading token is always an absolute timestamp (ns).
+        try:
+            ts_ns = int(line.split(" ", 1)[0])
+        except Exception:
+            return launch_ts_ns
+
+        if "| launcher:open_to_launcher |" in line:
+            m = DELTA_NS_RE.search(line)
+            if m:
+                out["open_to_launcher_ms"] = int(m.group(1)) / 1e6
+        elif "| launcher:exec-tmux |" in line:
+            out["launcher_exec_tmux_ts_ns"] = ts_ns
+        elif "| tmux:cmd:start |" in line:
+            out["tmux_cmd_start_ts_ns"] = ts_ns
+        elif "| tmux:client-attached |" in line:
+            out["tmux_client_attached_ts_ns"] = ts_ns
+        elif "| tmux:client-detached |" in line:
+            out["tmux_client_detached_ts_ns"] = ts_ns
+        elif "| launcher:tmux_impl=" in line:
+            m = TMUX_IMPL_RE.search(line)
+            if m:
+                out["tmux_impl"] = m.group(1)
+        return launch_ts_ns
+
+    def to_cache(self) -> dict:
+        return {"spans": pack_spans(self.spans), "latest": self.latest}
+
+    @classmethod
+    def from_cache(cls, state: dict, path: Path) -> LaunchLogIndex:
+        spans = unpack_spans(state["spans"])
+        return cls(spans=spans, latest=state["latest"], path=path, unloaded=set(spans))
+
+    def merge(self, later: LaunchLogIndex) -> None:
+        """Fold in the index of the lines that follow this one's."""
+        for k, v in later.events.items():
+            self.events.setdefault(k, {}).update(v)
+        merge_spans(self.spans, later.spans)
+        self.unloaded |= later.unloaded
+        if later.latest is not None:
+            self.latest = later.latest
+
+
+@dataclass
+class ShellLogIndex:
+    """First timestamp of each toggleterm-shell.log event, keyed by launch_ts_ns."""
+
+    events: dict[int, dict[str, int]] = field(default_factory=dict)
+    spans: dict[int, list[int]] = field(default_factory=dict)
+    path: Path | None = None
+    unloaded: set[int] = field(default_factory=set)
+
+    def feed(self, line: str, offset: int) -> int | None:
+        m = LAUNCH_TS_RE.search(line)
+        if not m:
+            return None
+        parts = [p.strip() for p in line.split("|")]
+        if len(parts) < 2:
+            return None
+        try:
+            ts_ns = int(parts[0])
+        except Exception:
+            return None
+        launch_ts_ns = int(m.group(1))
+        new_span(self.spans, launch_ts_ns, offset)
+        self.events.setdefault(launch_ts_ns, {}).setdefault(parts[1], ts_ns)
+        return launch_ts_ns
+
+    def to_cache(self) -> dict:
+        return {"spans": pack_spans(self.spans)}
+
+    @classmethod
+    def from_cache(cls, state: dict, path: Path) -> ShellLogIndex:
+        spans = unpack_spans(state["spans"])
+        return cls(spans=spans, path=path, unloaded=set(spans))
+
+    def merge(self, later: ShellLogIndex) -> None:
+        """Fold in the index of the lines that follow this one's."""
+        for k, v in later.events.items():
+            first = self.events.setdefault(k, {})
+            for name, ts_ns in v.items():
+                first.setdefault(name, ts_ns)
+        merge_spans(self.spans, later.spans)
+        self.unloaded |= later.unloaded
+
+
+# Union, not `|`: this alias is evaluated at import time, and macOS's stock python3 is 3.9.
+LogIndex = Union[PerfLogIndex, LaunchLogIndex, ShellLogIndex]
+
+CACHE_VERSION = 2
+TAIL_DIGEST_BYTES = 4096
+
+
+def default_cache_path() -> Path:
+    return Path(os.path.expanduser("~")) / ".local/state/humoodagen/ghostty-perf-report.cache"
+
+
+def scan_log(
+    path: Path, index: LogIndex, start: int = 0, end: int | None = None, *, complete_lines_only: bool = False
+) -> int:
+    """Feed every line of `path` from byte `start` (up to `end`) into `index`; returns the end offset.
+
+    With `complete_lines_only`, stop before a trailing line that has no newline yet
+    (a writer may still be appending to it), so the returned offset is safe to resume from.
+    """
+    offset = start
     try:
-        with perf_log.open("r", encoding="utf-8", errors="replace") as f:
+        with path.open("rb") as f:
+            f.seek(start)
             for raw in f:
-                line = raw.rstrip("\n")
-                if line.startswith("=== "):
-                    m = header_re.search(line)
-                    in_section = bool(m and int(m.group(1)) == launch_ts_ns)
-                    continue
-                if not in_section:
-                    continue
-                parts = [p.strip() for p in line.split("|")]
-                if len(parts) < 3:
-                    continue
-                if not parts[0].endswith("ms"):
-                    continue
-                if not parts[2].startswith("launch="):
-                    continue
-                try:
-                    ms_since_start = float(parts[0].removesuffix("ms").strip())
-                    label = parts[1]
-                    launch_ms = float(parts[2].split("=", 1)[1].removesuffix("ms").strip())
-                except Exception:
-                    continue
-                extra = " | ".join(parts[3:]).strip()
-                events.append(PerfEvent(ms_since_start=ms_since_start, label=label, launch_ms=launch_ms, extra=extra))
+                if end is not None and offset >= end:
+                    break
+                if complete_lines_only and not raw.endswith(b"\n"):
+                    break
+                index.feed(raw.decode("utf-8", errors="replace").rstrip("\n"), offset)
+                offset += len(raw)
     except FileNotFoundError:
-        return []
-    return events
+        return start
+    return offset
+
+
+def reload_launches(index: LogIndex, launches: Iterable[int]) -> None:
+    """Re-read the events of the `launches` in `index.unloaded`, in one pass over their spans.
+
+    Lines of other launches inside those spans are parsed too but dropped, so the
+    events match a scan from byte 0.
+    """
+    if index.path is None:
+        return
+    cold = [k for k in launches if k in index.unloaded]
+    if not cold:
+        return
+    fresh = type(index)()
+    start = min(index.spans[k][0] for k in cold)
+    scan_log(index.path, fresh, start, max(index.spans[k][1] for k in cold) + 1)
+    for k in cold:
+        if k in fresh.events:
+            index.events[k] = fresh.events[k]
+        index.unloaded.discard(k)
 
 
-def parse_launch_log(launch_log: Path, launch_ts_ns: int) -> dict[str, float | int | str]:
-    out: dict[str, float | int | str] = {}
-    needle = f"launch_ts_ns={launch_ts_ns}"
+@dataclass
+class LaunchIndex:
+    """One streaming pass over each log, covering every launch they contain."""
+
+    perf: PerfLogIndex
+    launch: LaunchLogIndex
+    shell: ShellLogIndex
+
+    def latest_launch_ts_ns(self) -> int | None:
+        return self.launch.latest or self.perf.latest
+
+    def launches(self) -> list[int]:
+        return sorted(set(self.launch.spans) | set(self.perf.spans) | set(self.shell.spans))
+
+    def preload(self, launches: Iterable[int]) -> None:
+        """Re-read the events of the unloaded `launches` in one pass per log, instead of one per launch."""
+        launches = list(launches)
+        for index in (self.perf, self.launch, self.shell):
+            reload_launches(index, launches)
+
+    def perf_events(self, launch_ts_ns: int) -> list[PerfEvent]:
+        reload_launches(self.perf, (launch_ts_ns,))
+        return self.perf.events.get(launch_ts_ns, [])
+
+    def launch_events(self, launch_ts_ns: int) -> dict[str, float | int | str]:
+        reload_launches(self.launch, (launch_ts_ns,))
+        return self.launch.events.get(launch_ts_ns, {})
+
+    def shell_events(self, launch_ts_ns: int) -> dict[str, int]:
+        reload_launches(self.shell, (launch_ts_ns,))
+        return self.shell.events.get(launch_ts_ns, {})
+
+    def markers(self, launch_ts_ns: int) -> dict[str, float]:
+        return launch_markers(
+            launch_ts_ns, self.perf_events(launch_ts_ns), self.launch_events(launch_ts_ns), self.shell_events(launch_ts_ns)
+        )
+
+
+def load_cache(cache_path: Path) -> dict:
     try:
-        with launch_log.open("r", encoding="utf-8", errors="replace") as f:
-            for raw in f:
-                line = raw.rstrip("\n")
-                if needle not in line:
-                    continue
-                # Leading token is always an absolute timestamp (ns).
-                try:
-                    ts_ns = int(line.split(" ", 1)[0])
-                except Exception:
-                    continue
+        with cache_path.open("rb") as f:
+            cache = pickle.load(f)
+    except Exception:
+        return {}
+    if not isinstance(cache, dict) or cache.get("version") != CACHE_VERSION:
+        return {}
+    return cache.get("logs", {})
+
+
+def save_cache(cache_path: Path, logs: dict) -> None:
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = cache_path.with_name(f"{cache_path.name}.tmp-{os.getpid()}")
+        with tmp.open("wb") as f:
+            pickle.dump({"version": CACHE_VERSION, "logs": logs}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, cache_path)
+    except OSError:
+        pass
+
+
+def tail_digest(path: Path, offset: int) -> str:
+    """Digest of the bytes just before `offset`, to notice a log emptied and rewritten in place."""
+    start = max(0, offset - TAIL_DIGEST_BYTES)
+    with path.open("rb") as f:
+        f.seek(start)
+        return hashlib.sha256(f.read(offset - start)).hexdigest()
+
+
+def restore_index(path: Path, empty: LogIndex, entry: dict | None, st: os.stat_result) -> tuple[LogIndex, int]:
+    """The cached index and offset to resume from, or (`empty`, 0) if the log was rotated, truncated or rewritten.
 
-                if "| launcher:open_to_launcher |" in line:
-                    m = re.search(r"delta_ns=(\d+)", line)
-                    if m:
-                        out["open_to_launcher_ms"] = int(m.group(1)) / 1e6
-                elif "| launcher:exec-tmux |" in line:
-                    out["launcher_exec_tmux_ts_ns"] = ts_ns
-                elif "| tmux:cmd:start |" in line:
-                    out["tmux_cmd_start_ts_ns"] = ts_ns
-                elif "| tmux:client-attached |" in line:
-                    out["tmux_client_attached_ts_ns"] = ts_ns
-                elif "| tmux:client-detached |" in line:
-                    out["tmux_client_detached_ts_ns"] = ts_ns
-                elif "| launcher:tmux_impl=" in line:
-                    m = re.search(r"launcher:tmux_impl=([^ ]+)", line)
-                    if m:
-                        out["tmux_impl"] = m.group(1)
+    The restored index only has spans for the cached launches; their events are
+    re-read on demand, so loading costs the same however long the logs have grown.
+    """
+    if entry and entry.get("inode") == st.st_ino and entry.get("offset", 0) <= st.st_size:
+        try:
+            if entry["digest"] == tail_digest(path, entry["offset"]):
+                return type(empty).from_cache(entry["state"], path), entry["offset"]
+        except Exception:
+            pass
+    return empty, 0
+
+
+# Logs with less than this left to read are scanned in-process even with --jobs.
+PARALLEL_MIN_BYTES = 32 << 20
+CHUNK_BYTES = 8 << 20
+# Chunks of the perf log must start at a section header so they parse without context.
+CHUNK_BOUNDARIES: dict[type, bytes] = {PerfLogIndex: b"=== ", LaunchLogIndex: b"", ShellLogIndex: b""}
+
+
+def complete_lines_end(path: Path, start: int) -> int:
+    """Offset just past the last newline of `path` (at least `start`)."""
+    with path.open("rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size <= start:
+            return start
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return max(start, mm.rfind(b"\n", start, size) + 1)
+
+
+def split_ranges(path: Path, start: int, end: int, chunk_bytes: int, boundary: bytes) -> list[tuple[int, int]]:
+    """Byte ranges covering [start, end); every range after the first starts at a line beginning with `boundary`."""
+    cuts = [start]
+    if end - start > chunk_bytes:
+        with path.open("rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            pos = start + chunk_bytes
+            while pos < end:
+                nl = mm.find(b"\n" + boundary, pos - 1, end)
+                if nl < 0 or nl + 1 >= end:
+                    break
+                cuts.append(nl + 1)
+                pos = nl + 1 + chunk_bytes
+    cuts.append(end)
+    return list(zip(cuts, cuts[1:]))
+
+
+def scan_range(index_type: type, path: Path, start: int, end: int) -> dict:
+    """Worker: index `path[start:end]` from scratch; returns only its spans, as the cache would.
+
+    Pickling the events back would cost the parent about as much as parsing them, so
+    the parent re-reads the launches it reports on instead (see `reload_launches`).
+    """
+    index = index_type()
+    scan_log(path, index, start, end)
+    return index.to_cache()
+
+
+def submit_complete_lines(path: Path, index: LogIndex, start: int, pool: Executor | None) -> Callable[[], int]:
+    """Start `scan_log(..., complete_lines_only=True)`, fanning a large remainder out to `pool` in chunks.
+
+    The chunks after the first are submitted right away; the returned function indexes
+    the first chunk in-process (it may belong to a section that began before `start`),
+    merges the workers' results back in file order and returns the end offset.
+    """
+    if pool is None:
+        return lambda: scan_log(path, index, start, complete_lines_only=True)
+    try:
+        end = complete_lines_end(path, start)
     except FileNotFoundError:
-        return out
-    return out
+        return lambda: start
+    if end - start < PARALLEL_MIN_BYTES:
+        return lambda: scan_log(path, index, start, end)
+    index_type = type(index)
+    (first_start, first_end), *rest = split_ranges(path, start, end, CHUNK_BYTES, CHUNK_BOUNDARIES[index_type])
+    futures = [pool.submit(scan_range, index_type, path, a, b) for a, b in rest]
 
+    def finish() -> int:
+        scan_log(path, index, first_start, first_end)
+        for future in futures:
+            index.merge(index_type.from_cache(future.result(), path))
+        return end
 
-def parse_shell_log(shell_log: Path, launch_ts_ns: int) -> dict[str, int]:
-    out: dict[str, int] = {}
-    needle = f"launch_ts_ns={launch_ts_ns}"
+    return finish
+
+
+def submit_log(
+    path: Path, empty: LogIndex, entry: dict | None, pool: Executor | None = None
+) -> Callable[[], tuple[LogIndex, dict | None]]:
+    """Start indexing `path`, resuming from a cache entry unless it was rotated, truncated or rewritten.
+
+    The returned function finishes the scan and returns the index (including any
+    partial trailing line) and the new cache entry, which only covers complete lines.
+    """
     try:
-        with shell_log.open("r", encoding="utf-8", errors="replace") as f:
-            for raw in f:
-                line = raw.rstrip("\n")
-                if needle not in line:
-                    continue
-                parts = [p.strip() for p in line.split("|")]
-                if len(parts) < 2:
-                    continue
-                try:
-                    ts_ns = int(parts[0])
-                except Exception:
-                    continue
-                event = parts[1]
-                out.setdefault(event, ts_ns)
+        st = path.stat()
     except FileNotFoundError:
-        return out
-    return out
+        return lambda: (empty, None)
 
+    index, start = restore_index(path, empty, entry, st)
+    index.path = path
+    scan_to_end = submit_complete_lines(path, index, start, pool)
 
-def first_event(events: list[PerfEvent], label: str) -> PerfEvent | None:
-    for ev in events:
-        if ev.label == label:
-            return ev
-    return None
+    def finish() -> tuple[LogIndex, dict | None]:
+        offset = scan_to_end()
+        if start and offset == start:
+            new_entry = entry
+        else:
+            # Pack now: the partial-line pass below extends the live spans.
+            new_entry = {"inode": st.st_ino, "offset": offset, "digest": tail_digest(path, offset), "state": index.to_cache()}
+        # A partial last line is indexed for this report but re-read next time.
+        scan_log(path, index, offset)
+        return index, new_entry
+
+    return finish
+
+
+def build_index(
+    perf_log: Path, launch_log: Path, shell_log: Path, cache_path: Path | None = None, jobs: int = 1
+) -> LaunchIndex:
+    """Index the three logs (resuming from `cache_path` if given).
+
+    With `jobs` > 1, any log with more than PARALLEL_MIN_BYTES left to read is split
+    into chunks parsed in `jobs` processes. Every log's chunks are submitted before
+    any log is finished, so the workers parse all of them while this process handles
+    the first chunks and the smaller logs.
+    """
+    logs_to_scan = ((perf_log, PerfLogIndex()), (launch_log, LaunchLogIndex()), (shell_log, ShellLogIndex()))
+    cached = load_cache(cache_path) if cache_path is not None else {}
+    pool = ProcessPoolExecutor(max_workers=jobs) if jobs > 1 else None
+    try:
+        pending = [submit_log(path, empty, cached.get(str(path)), pool) for path, empty in logs_to_scan]
+        scanned = [finish() for finish in pending]
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    if cache_path is None:
+        perf, launch, shell = (index for index, _entry in scanned)
+        return LaunchIndex(perf=perf, launch=launch, shell=shell)
+
+    logs: dict = {}
+    indexes: list[LogIndex] = []
+    changed = False
+    for (path, _empty), (index, entry) in zip(logs_to_scan, scanned):
+        old = cached.get(str(path))
+        if entry is not None:
+            logs[str(path)] = entry
+        if entry is not old:
+            changed = True
+        indexes.append(index)
+    if changed:
+        save_cache(cache_path, logs)
+    perf, launch, shell = indexes
+    return LaunchIndex(perf=perf, launch=launch, shell=shell)
 
 
 def fmt_ms(v: float | None) -> str:
@@ -156,197 +532,1300 @@ def fmt_ms(v: float | None) -> str:
     return f"{v:.2f}ms"
 
 
-def main() -> int:
-    parser = argparse.ArgumentParser(description="Summarize latest Ghostty→tmux→nvim→toggleterm cold-start timing.")
-    parser.add_argument("--launch", type=int, default=None, help="launch_ts_ns to report (defaults to latest in perf log)")
-    args = parser.parse_args()
+@dataclass(frozen=True)
+class Span:
+    """A metric measured from `start` to `end`.
 
-    home = Path(os.path.expanduser("~"))
-    perf_log = home / ".local/state/nvim/humoodagen-perf.log"
-    launch_log = home / ".local/state/humoodagen/ghostty-launch.log"
-    shell_log = home / ".local/state/humoodagen/toggleterm-shell.log"
+    Markers are written `source:label`, where source is the log they come from:
+    `perf` (launch-relative ms), `launch` and `shell` (absolute ns). A tuple lists
+    fallbacks, tried in order. Every marker is normalized to ms since launch_ts_ns,
+    so a span can cross logs.
+    """
+
+    key: str
+    label: str
+    start: str | tuple[str, ...]
+    end: str | tuple[str, ...]
+
+
+LAUNCH = "launch:launcher:start"
+OPEN = "launch:launcher:open"
+NVIM_INIT = "perf:nvim:init"
+PROMPT_READY = ("shell:toggleterm:prompt:first", "launch:tmux:client-attached")
+
+# Report order; the labels match the single-launch report.
+METRICS: list[Span] = [
+    Span("open_to_launcher_ms", "open→launcher", OPEN, LAUNCH),
+    Span("open_to_prompt_stdout_ms", "open→prompt stdout", OPEN, "perf:toggleterm:stdout:first"),
+    Span("launch_to_prompt_stdout_ms", "launch→prompt stdout", LAUNCH, "perf:toggleterm:stdout:first"),
+    Span("open_to_prompt_ready_ms", "open→prompt ready", OPEN, PROMPT_READY),
+    Span("launch_to_prompt_ready_ms", "launch→prompt ready", LAUNCH, PROMPT_READY),
+    Span("launcher_to_exec_tmux_ms", "launcher→exec tmux", LAUNCH, "launch:launcher:exec-tmux"),
+    Span("exec_tmux_to_client_attached_ms", "exec tmux→client attached", "launch:launcher:exec-tmux", "launch:tmux:client-attached"),
+    Span("launch_to_client_attached_ms", "launch→client attached", LAUNCH, "launch:tmux:client-attached"),
+    Span("exec_tmux_to_tmux_cmd_ms", "exec tmux→tmux cmd start", "launch:launcher:exec-tmux", "launch:tmux:cmd:start"),
+    Span("client_attached_to_tmux_cmd_ms", "client attached→tmux cmd start", "launch:tmux:client-attached", "launch:tmux:cmd:start"),
+    Span("tmux_cmd_to_nvim_init_ms", "tmux cmd start→nvim init start", "launch:tmux:cmd:start", NVIM_INIT),
+    Span("launch_to_nvim_init_ms", "launch→nvim init start", LAUNCH, NVIM_INIT),
+    Span("init_to_lazy_done_ms", "init→LazyDone", NVIM_INIT, "perf:User LazyDone"),
+    Span("init_to_vim_enter_ms", "init→VimEnter", NVIM_INIT, "perf:VimEnter"),
+    Span("init_to_ui_enter_ms", "init→UIEnter", NVIM_INIT, "perf:UIEnter"),
+    Span("init_to_tree_open_ms", "init→nvim-tree open done", NVIM_INIT, "perf:nvim-tree:open:done"),
+    Span(
+        "tt_open_ms",
+        "toggleterm open window",
+        "perf:toggleterm:startup:open_horizontal_in_win:begin",
+        "perf:toggleterm:startup:open_horizontal_in_win:done",
+    ),
+    Span("tt_spawn_ms", "toggleterm spawn call", "perf:toggleterm:term:spawn:begin", "perf:toggleterm:term:spawn:done"),
+    Span("init_to_tt_startup_done_ms", "init→toggleterm startup done", NVIM_INIT, "perf:toggleterm:startup:done"),
+    Span(
+        "tt_startup_done_to_stdout_ms",
+        "toggleterm startup done→stdout:first",
+        "perf:toggleterm:startup:done",
+        "perf:toggleterm:stdout:first",
+    ),
+    Span(
+        "tt_spawn_to_stdout_ms",
+        "toggleterm spawn done→stdout:first",
+        "perf:toggleterm:term:spawn:done",
+        "perf:toggleterm:stdout:first",
+    ),
+    Span("init_to_stdout_first_ms", "init→first toggleterm stdout", NVIM_INIT, "perf:toggleterm:stdout:first"),
+    Span("zshenv_begin_ms", "zshenv begin", LAUNCH, "shell:toggleterm:zshenv:begin"),
+    Span(
+        "zshenv_source_ms",
+        "zshenv source (.zshenv)",
+        ("shell:toggleterm:zshenv:source_orig:begin", "shell:toggleterm:zshenv:source_home:begin"),
+        ("shell:toggleterm:zshenv:source_orig:done", "shell:toggleterm:zshenv:source_home:done"),
+    ),
+    Span("zshenv_total_ms", "zshenv total", "shell:toggleterm:zshenv:begin", "shell:toggleterm:zshenv:end"),
+    Span("zshrc_begin_ms", "zshrc begin", LAUNCH, "shell:toggleterm:zshrc:begin"),
+    Span("prompt_first_ms", "first prompt (precmd)", LAUNCH, "shell:toggleterm:prompt:first"),
+    Span("zshrc_fast_init_ms", "zshrc fast-init body", "shell:toggleterm:zshrc:begin", "shell:toggleterm:zshrc:end_fast_init"),
+]
+METRIC_KEYS: tuple[str, ...] = tuple(span.key for span in METRICS)
+
+
+class LaunchMetrics:
+    """Timing breakdown of one launch; every metric is milliseconds or None when its markers are missing."""
+
+    __slots__ = ("launch_ts_ns", "tmux_impl") + METRIC_KEYS
+
+    def __init__(self, launch_ts_ns: int, tmux_impl: str | None = None, **values: float | None) -> None:
+        self.launch_ts_ns = launch_ts_ns
+        self.tmux_impl = tmux_impl
+        for key in METRIC_KEYS:
+            setattr(self, key, values.pop(key, None))
+        if values:
+            raise TypeError(f"unknown metrics: {', '.join(sorted(values))}")
+
+    def get(self, key: str) -> float | None:
+        return getattr(self, key)
+
+    def to_dict(self) -> dict[str, int | float | str | None]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+# launch-log fields that hold an absolute timestamp, by the marker label they stand for.
+LAUNCH_LOG_MARKERS = {
+    "launcher_exec_tmux_ts_ns": "launcher:exec-tmux",
+    "tmux_cmd_start_ts_ns": "tmux:cmd:start",
+    "tmux_client_attached_ts_ns": "tmux:client-attached",
+    "tmux_client_detached_ts_ns": "tmux:client-detached",
+}
+
+
+def launch_markers(
+    launch_ts_ns: int,
+    perf_events: list[PerfEvent],
+    launch_events: dict[str, float | int | str],
+    shell_events: dict[str, int],
+) -> dict[str, float]:
+    """First occurrence of every marker of one launch, in ms since launch_ts_ns."""
+    markers: dict[str, float] = {LAUNCH: 0.0}
+
+    open_to_launcher = launch_events.get("open_to_launcher_ms")
+    if isinstance(open_to_launcher, float):
+        markers[OPEN] = -open_to_launcher
+    for key, label in LAUNCH_LOG_MARKERS.items():
+        ts_ns = launch_events.get(key)
+        if isinstance(ts_ns, int):
+            markers[f"launch:{label}"] = (ts_ns - launch_ts_ns) / 1e6
+
+    for ev in perf_events:
+        key = f"perf:{ev.label}"
+        if key not in markers:
+            markers[key] = ev.launch_ms
+            if ev.label == "perf enabled":
+                # launch time when init.lua started (hrtime baseline set)
+                markers[NVIM_INIT] = ev.launch_ms - ev.ms_since_start
+
+    for event, ts_ns in shell_events.items():
+        if ts_ns:
+            markers[f"shell:{event}"] = (ts_ns - launch_ts_ns) / 1e6
+    return markers
+
+
+def resolve_marker(markers: dict[str, float], ref: str | tuple[str, ...]) -> str | None:
+    """The first marker of `ref` (a marker or tuple of fallbacks) present in `markers`."""
+    for alt in (ref,) if isinstance(ref, str) else ref:
+        if alt in markers:
+            return alt
+    return None
+
+
+def marker_ms(markers: dict[str, float], ref: str | tuple[str, ...]) -> float | None:
+    key = resolve_marker(markers, ref)
+    return markers[key] if key is not None else None
+
+
+def compute_metrics(
+    launch_ts_ns: int,
+    perf_events: list[PerfEvent],
+    launch_events: dict[str, float | int | str],
+    shell_events: dict[str, int],
+) -> LaunchMetrics:
+    markers = launch_markers(launch_ts_ns, perf_events, launch_events, shell_events)
+    values: dict[str, float | None] = {}
+    for span in METRICS:
+        start = marker_ms(markers, span.start)
+        end = marker_ms(markers, span.end)
+        values[span.key] = end - start if start is not None and end is not None else None
+    tmux_impl = launch_events.get("tmux_impl")
+    return LaunchMetrics(launch_ts_ns, tmux_impl if isinstance(tmux_impl, str) else None, **values)
+
+
+def print_report(m: LaunchMetrics) -> None:
+    print(f"launch_ts_ns={m.launch_ts_ns}")
+    if m.tmux_impl is not None:
+        print(f"tmux_impl={m.tmux_impl}")
+
+    print("\n**Ghostty → launcher**")
+    print(f"- open→launcher: {fmt_ms(m.open_to_launcher_ms)}")
+    print(f"- open→prompt stdout: {fmt_ms(m.open_to_prompt_stdout_ms)}")
+    print(f"- launch→prompt stdout: {fmt_ms(m.launch_to_prompt_stdout_ms)}")
+    if m.open_to_prompt_ready_ms is not None:
+        print(f"- open→prompt ready: {fmt_ms(m.open_to_prompt_ready_ms)}")
+    if m.prompt_first_ms is not None:
+        print(f"- launch→prompt ready: {fmt_ms(m.prompt_first_ms)}")
+    else:
+        print(f"- launch→prompt ready (tmux attach): {fmt_ms(m.launch_to_client_attached_ms)}")
+
+    print("\n**launcher → tmux**")
+    print(f"- launcher→exec tmux: {fmt_ms(m.launcher_to_exec_tmux_ms)}")
+    print(f"- exec tmux→client attached: {fmt_ms(m.exec_tmux_to_client_attached_ms)}")
+    print(f"- launch→client attached: {fmt_ms(m.launch_to_client_attached_ms)}")
+    print(f"- exec tmux→tmux cmd start: {fmt_ms(m.exec_tmux_to_tmux_cmd_ms)}")
+    print(f"- client attached→tmux cmd start: {fmt_ms(m.client_attached_to_tmux_cmd_ms)}")
+    print(f"- tmux cmd start→nvim init start: {fmt_ms(m.tmux_cmd_to_nvim_init_ms)}")
+    print(f"- launch→nvim init start: {fmt_ms(m.launch_to_nvim_init_ms)}")
+
+    print("\n**nvim (from init.lua start)**")
+    if m.launch_to_nvim_init_ms is None:
+        print("- nvim init: n/a (session reused or perf markers missing)")
+    else:
+        print(f"- init→LazyDone: {fmt_ms(m.init_to_lazy_done_ms)}")
+        print(f"- init→VimEnter: {fmt_ms(m.init_to_vim_enter_ms)}")
+        print(f"- init→UIEnter: {fmt_ms(m.init_to_ui_enter_ms)}")
+        print(f"- init→nvim-tree open done: {fmt_ms(m.init_to_tree_open_ms)}")
+        print(f"- toggleterm open window: {fmt_ms(m.tt_open_ms)}")
+        print(f"- toggleterm spawn call: {fmt_ms(m.tt_spawn_ms)}")
+        if m.init_to_tt_startup_done_ms is not None:
+            print(f"- init→toggleterm startup done: {fmt_ms(m.init_to_tt_startup_done_ms)}")
+            print(f"- toggleterm startup done→stdout:first: {fmt_ms(m.tt_startup_done_to_stdout_ms)}")
+        print(f"- toggleterm spawn done→stdout:first: {fmt_ms(m.tt_spawn_to_stdout_ms)}")
+        print(f"- init→first toggleterm stdout: {fmt_ms(m.init_to_stdout_first_ms)}")
+
+    print("\n**zsh (toggleterm shell)**")
+    print(f"- zshenv begin: {fmt_ms(m.zshenv_begin_ms)}")
+    print(f"- zshenv source (.zshenv): {fmt_ms(m.zshenv_source_ms)}")
+    if m.zshenv_total_ms is not None:
+        print(f"- zshenv total: {fmt_ms(m.zshenv_total_ms)}")
+    print(f"- zshrc begin: {fmt_ms(m.zshrc_begin_ms)}")
+    print(f"- first prompt (precmd): {fmt_ms(m.prompt_first_ms)}")
+    if m.zshrc_fast_init_ms is not None:
+        print(f"- zshrc fast-init body: {fmt_ms(m.zshrc_fast_init_ms)}")
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    """Linear-interpolated percentile of an already sorted, non-empty list (q in 0..100)."""
+    if len(sorted_values) == 1:
+        return sorted_values[0]
+    pos = (len(sorted_values) - 1) * q / 100.0
+    lo = int(pos)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (pos - lo)
+
+
+@dataclass(frozen=True)
+class MetricStats:
+    count: int
+    min: float
+    p50: float
+    p90: float
+    p99: float
+    max: float
 
-    launch_ts_ns = args.launch or read_latest_launch_ts_ns_from_launch_log(launch_log) or read_latest_launch_ts_ns(perf_log)
-    if not launch_ts_ns:
-        print(f"Could not find a launch_ts_ns in {perf_log}")
-        return 1
-
-    perf_events = parse_perf_section(perf_log, launch_ts_ns)
-    launch_events = parse_launch_log(launch_log, launch_ts_ns)
-    shell_events = parse_shell_log(shell_log, launch_ts_ns)
-
-    perf_enabled = first_event(perf_events, "perf enabled")
-    lazy_done = first_event(perf_events, "User LazyDone")
-    vim_enter = first_event(perf_events, "VimEnter")
-    ui_enter = first_event(perf_events, "UIEnter")
-    tt_open_begin = first_event(perf_events, "toggleterm:startup:open_horizontal_in_win:begin")
-    tt_open_done = first_event(perf_events, "toggleterm:startup:open_horizontal_in_win:done")
-    tt_spawn_begin = first_event(perf_events, "toggleterm:term:spawn:begin")
-    tt_spawn_done = first_event(perf_events, "toggleterm:term:spawn:done")
-    tt_startup_done = first_event(perf_events, "toggleterm:startup:done")
-    tt_stdout_first = first_event(perf_events, "toggleterm:stdout:first")
-    tree_open_start = first_event(perf_events, "nvim-tree:open:start")
-    tree_open_done = first_event(perf_events, "nvim-tree:open:done")
-
-    nvim_init_start_launch_ms: float | None = None
-    nvim_init_start_abs_ns: int | None = None
-    if perf_enabled:
-        # launch time when init.lua started (hrtime baseline set)
-        nvim_init_start_launch_ms = perf_enabled.launch_ms - perf_enabled.ms_since_start
-        nvim_init_start_abs_ns = int(launch_ts_ns + (nvim_init_start_launch_ms * 1e6))
-
-    launcher_exec_tmux_ts_ns = launch_events.get("launcher_exec_tmux_ts_ns")
-    tmux_cmd_start_ts_ns = launch_events.get("tmux_cmd_start_ts_ns")
-    tmux_client_attached_ts_ns = launch_events.get("tmux_client_attached_ts_ns")
-
-    def delta_ms(a_ns: int | None, b_ns: int | None) -> float | None:
-        if a_ns is None or b_ns is None:
-            return None
-        return (b_ns - a_ns) / 1e6
 
-    open_to_launcher_ms = launch_events.get("open_to_launcher_ms")
-    launcher_to_exec_tmux_ms = (launcher_exec_tmux_ts_ns - launch_ts_ns) / 1e6 if isinstance(launcher_exec_tmux_ts_ns, int) else None
-    exec_tmux_to_tmux_cmd_ms = (
-        delta_ms(launcher_exec_tmux_ts_ns if isinstance(launcher_exec_tmux_ts_ns, int) else None,
-                 tmux_cmd_start_ts_ns if isinstance(tmux_cmd_start_ts_ns, int) else None)
+def metric_stats(values: Iterable[float]) -> MetricStats | None:
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    return MetricStats(
+        count=len(ordered),
+        min=ordered[0],
+        p50=percentile(ordered, 50),
+        p90=percentile(ordered, 90),
+        p99=percentile(ordered, 99),
+        max=ordered[-1],
     )
-    tmux_cmd_to_nvim_init_ms = (
-        delta_ms(tmux_cmd_start_ts_ns if isinstance(tmux_cmd_start_ts_ns, int) else None, nvim_init_start_abs_ns)
-        if isinstance(nvim_init_start_abs_ns, int)
-        else None
+
+
+def summarize(samples: list[LaunchMetrics]) -> dict[str, MetricStats]:
+    out: dict[str, MetricStats] = {}
+    for key in METRIC_KEYS:
+        st = metric_stats(v for s in samples if (v := s.get(key)) is not None)
+        if st is not None:
+            out[key] = st
+    return out
+
+
+def parse_since(value: str) -> int:
+    """`--since` accepts an ISO date/datetime (local time if naive) or a relative age like 7d, 12h, 30m."""
+    m = re.fullmatch(r"(\d+)([dhm])", value.strip())
+    if m:
+        seconds = int(m.group(1)) * {"d": 86400, "h": 3600, "m": 60}[m.group(2)]
+        return time.time_ns() - seconds * 1_000_000_000
+    try:
+        return int(datetime.fromisoformat(value).timestamp() * 1e9)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid date: {value!r}") from None
+
+
+def select_launches(index: LaunchIndex, since_ns: int | None, last: int | None) -> list[int]:
+    launches = index.launches()
+    if since_ns is not None:
+        launches = launches[bisect.bisect_left(launches, since_ns):]
+    if last is not None:
+        launches = launches[-last:] if last > 0 else []
+    return launches
+
+
+def iter_metrics(index: LaunchIndex, launches: Iterable[int]) -> Iterator[LaunchMetrics]:
+    for ts in launches:
+        yield compute_metrics(ts, index.perf_events(ts), index.launch_events(ts), index.shell_events(ts))
+
+
+def write_ndjson(records: Iterable[LaunchMetrics], out: TextIO) -> None:
+    for m in records:
+        out.write(json.dumps(m.to_dict(), ensure_ascii=False) + "\n")
+        out.flush()
+
+
+def write_csv(records: Iterable[LaunchMetrics], out: TextIO) -> None:
+    writer = csv.writer(out)
+    writer.writerow(LaunchMetrics.__slots__)
+    for m in records:
+        writer.writerow(["" if (v := getattr(m, name)) is None else v for name in LaunchMetrics.__slots__])
+
+
+def stats_to_dict(stats: dict[str, MetricStats]) -> dict[str, dict[str, float | int]]:
+    return {key: asdict(st) for key, st in stats.items()}
+
+
+def regressions_against(stats: dict[str, MetricStats], baseline: dict[str, float], threshold_pct: float) -> list[str]:
+    return [
+        key
+        for key, st in stats.items()
+        if (base := baseline.get(key)) is not None and st.p50 - base > abs(base) * threshold_pct / 100.0
+    ]
+
+
+@dataclass
+class LogTail:
+    """An open log that is polled for appended lines, reopened from byte 0 after rotation/truncation."""
+
+    path: Path
+    index: LogIndex
+    offset: int = 0
+    inode: int | None = None
+    pending: bytes = b""
+    f: BinaryIO | None = None
+
+    def close(self) -> None:
+        if self.f is not None:
+            self.f.close()
+            self.f = None
+
+    def poll(self) -> set[int]:
+        """Feed complete new lines into the index; returns the launches they touched."""
+        touched: set[int] = set()
+        try:
+            st = self.path.stat()
+        except FileNotFoundError:
+            self.close()
+            return touched
+        if self.inode is not None and (st.st_ino != self.inode or st.st_size < self.offset):
+            self.close()
+            self.offset, self.pending = 0, b""
+            if isinstance(self.index, PerfLogIndex):
+                self.index.current = None
+            # Cached spans point into the old file; launches from it keep whatever events are in memory.
+            self.index.path = None
+        if self.f is None:
+            self.f = self.path.open("rb")
+            self.f.seek(self.offset + len(self.pending))
+        self.inode = st.st_ino
+
+        data = self.f.read()
+        if not data:
+            return touched
+        lines = (self.pending + data).split(b"\n")
+        self.pending = lines.pop()
+        for raw in lines:
+            launch_ts_ns = self.index.feed(raw.decode("utf-8", errors="replace"), self.offset)
+            if launch_ts_ns is not None:
+                touched.add(launch_ts_ns)
+            self.offset += len(raw) + 1
+        return touched
+
+
+# Either marker means the toggleterm shell is up, so the launch can be reported.
+LAUNCH_DONE_MARKERS = ("shell:toggleterm:prompt:first", "perf:toggleterm:stdout:first")
+
+
+def follow(
+    perf_log: Path,
+    launch_log: Path,
+    shell_log: Path,
+    cache_path: Path | None,
+    *,
+    fmt: str,
+    interval: float,
+    settle: float,
+    timeout: float,
+) -> int:
+    """Tail the three logs and report each new launch once it reaches a prompt (or times out)."""
+    cached = load_cache(cache_path) if cache_path is not None else {}
+    tails: list[LogTail] = []
+    for path, empty in ((perf_log, PerfLogIndex()), (launch_log, LaunchLogIndex()), (shell_log, ShellLogIndex())):
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            tails.append(LogTail(path, empty))
+            continue
+        # Only complete history is indexed up front; new lines are picked up by poll().
+        index, start = restore_index(path, empty, cached.get(str(path)), st)
+        offset = scan_log(path, index, start, complete_lines_only=True)
+        tails.append(LogTail(path, index, offset=offset, inode=st.st_ino))
+    perf_tail, launch_tail, shell_tail = tails
+    index = LaunchIndex(perf=perf_tail.index, launch=launch_tail.index, shell=shell_tail.index)
+
+    seen = set(index.launches())
+    first_seen: dict[int, float] = {}
+    done_at: dict[int, float] = {}
+    # Launches that were still starting up when we attached are reported too, timed
+    # from their own launch_ts_ns. Older ones (e.g. tmux re-attaches, which never log
+    # a prompt) would only be reported as partial right away, so they are skipped.
+    now, now_ns = time.monotonic(), time.time_ns()
+    for launch_ts_ns in seen:
+        age_ns = now_ns - launch_ts_ns
+        if 0 <= age_ns < timeout * 1e9 and not any(k in index.markers(launch_ts_ns) for k in LAUNCH_DONE_MARKERS):
+            first_seen[launch_ts_ns] = now - age_ns / 1e9
+
+    def emit(launch_ts_ns: int, complete: bool) -> None:
+        m = compute_metrics(
+            launch_ts_ns, index.perf_events(launch_ts_ns), index.launch_events(launch_ts_ns), index.shell_events(launch_ts_ns)
+        )
+        if fmt == "ndjson":
+            sys.stdout.write(json.dumps({**m.to_dict(), "complete": complete}, ensure_ascii=False) + "\n")
+        else:
+            if not complete:
+                print(f"(no prompt after {timeout:g}s; partial report)")
+            print_report(m)
+            print()
+        sys.stdout.flush()
+
+    try:
+        while True:
+            now = time.monotonic()
+            for tail in tails:
+                for launch_ts_ns in tail.poll():
+                    if launch_ts_ns not in seen:
+                        seen.add(launch_ts_ns)
+                        first_seen[launch_ts_ns] = now
+            for launch_ts_ns in sorted(first_seen):
+                if launch_ts_ns not in done_at:
+                    markers = index.markers(launch_ts_ns)
+                    if any(k in markers for k in LAUNCH_DONE_MARKERS):
+                        done_at[launch_ts_ns] = now
+                # Give the other logs a moment to flush their lines for the same launch.
+                if launch_ts_ns in done_at and now - done_at[launch_ts_ns] >= settle:
+                    emit(launch_ts_ns, complete=True)
+                elif launch_ts_ns not in done_at and now - first_seen[launch_ts_ns] >= timeout:
+                    emit(launch_ts_ns, complete=False)
+                else:
+                    continue
+                del first_seen[launch_ts_ns]
+                done_at.pop(launch_ts_ns, None)
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        return 0
+    finally:
+        for tail in tails:
+            tail.close()
+
+
+# Trace processes, in track order.
+TRACE_PROCESSES = ("launcher", "tmux", "nvim", "zsh")
+
+
+def marker_process(marker: str) -> str:
+    source, label = marker.split(":", 1)
+    if source == "perf":
+        return "nvim"
+    if source == "shell":
+        return "zsh"
+    return "tmux" if label.startswith("tmux:") else "launcher"
+
+
+def marker_name(marker: str) -> str:
+    return marker.split(":", 1)[1]
+
+
+def trace_events(index: LaunchIndex, launches: Iterable[int]) -> list[dict]:
+    """Chrome Trace Event / Perfetto events for `launches` on one absolute clock (µs since epoch).
+
+    Each process gets a "markers" track with every marker as an instant plus the
+    stretches between consecutive markers, and one track per Span that ends in it.
+    """
+    pids = {name: i + 1 for i, name in enumerate(TRACE_PROCESSES)}
+    span_tids = {span.key: i + 2 for i, span in enumerate(METRICS)}
+    events: list[dict] = []
+    for name, pid in pids.items():
+        events.append({"ph": "M", "name": "process_name", "pid": pid, "tid": 0, "args": {"name": name}})
+        events.append({"ph": "M", "name": "process_sort_index", "pid": pid, "tid": 0, "args": {"sort_index": pid}})
+        events.append({"ph": "M", "name": "thread_name", "pid": pid, "tid": 1, "args": {"name": "markers"}})
+
+    named_threads: set[tuple[int, int]] = set()
+    for launch_ts_ns in launches:
+        markers = index.markers(launch_ts_ns)
+        base_us = launch_ts_ns / 1e3
+        args = {"launch_ts_ns": launch_ts_ns}
+
+        by_process: dict[str, list[tuple[float, str]]] = {}
+        for marker, ms in markers.items():
+            by_process.setdefault(marker_process(marker), []).append((ms, marker))
+        for process, items in by_process.items():
+            pid = pids[process]
+            items.sort()
+            for ms, marker in items:
+                events.append({"ph": "i", "s": "t", "name": marker_name(marker), "pid": pid, "tid": 1, "ts": base_us + ms * 1e3, "args": args})
+            for (a_ms, a), (b_ms, b) in zip(items, items[1:]):
+                events.append(
+                    {
+                        "ph": "X",
+                        "name": f"{marker_name(a)} → {marker_name(b)}",
+                        "pid": pid,
+                        "tid": 1,
+                        "ts": base_us + a_ms * 1e3,
+                        "dur": (b_ms - a_ms) * 1e3,
+                        "args": args,
+                    }
+                )
+
+        for span in METRICS:
+            start, end = resolve_marker(markers, span.start), resolve_marker(markers, span.end)
+            if start is None or end is None:
+                continue
+            pid, tid = pids[marker_process(end)], span_tids[span.key]
+            if (pid, tid) not in named_threads:
+                named_threads.add((pid, tid))
+                events.append({"ph": "M", "name": "thread_name", "pid": pid, "tid": tid, "args": {"name": span.label}})
+                events.append({"ph": "M", "name": "thread_sort_index", "pid": pid, "tid": tid, "args": {"sort_index": tid}})
+            events.append(
+                {
+                    "ph": "X",
+                    "name": span.label,
+                    "pid": pid,
+                    "tid": tid,
+                    "ts": base_us + markers[start] * 1e3,
+                    "dur": (markers[end] - markers[start]) * 1e3,
+                    "args": {**args, "start": start, "end": end},
+                }
+            )
+    return events
+
+
+def write_trace(path: Path, index: LaunchIndex, launches: list[int]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    data = {"traceEvents": trace_events(index, launches), "displayTimeUnit": "ms"}
+    path.write_text(json.dumps(data, ensure_ascii=False) + "\n", encoding="utf-8")
+
+
+def folded_stacks(index: LaunchIndex, launches: Iterable[int]) -> dict[str, int]:
+    """Folded stacks (µs) of the merged marker timeline: `launch;<process>;<prev> → <marker>`.
+
+    Each stretch between consecutive markers (across all logs) is charged to the
+    process whose marker ends it, so handoff gaps like exec-tmux → client-attached
+    show up. Identical stacks are summed across launches.
+    """
+    out: dict[str, int] = {}
+    for launch_ts_ns in launches:
+        items = sorted((ms, marker) for marker, ms in index.markers(launch_ts_ns).items())
+        for (a_ms, a), (b_ms, b) in zip(items, items[1:]):
+            # Only the last space separates the count, so labels can keep theirs.
+            stack = f"launch;{marker_process(b)};{marker_name(a)} → {marker_name(b)}"
+            out[stack] = out.get(stack, 0) + round((b_ms - a_ms) * 1e3)
+    return out
+
+
+def write_folded(path: Path, index: LaunchIndex, launches: list[int]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    lines = [f"{stack} {us}" for stack, us in folded_stacks(index, launches).items() if us > 0]
+    path.write_text("\n".join(lines) + ("\n" if lines else ""), encoding="utf-8")
+
+
+# marker → markers it has to wait for. The toggleterm job forks zsh during the spawn
+# call, which only starts once the terminal window is open.
+CRITICAL_PATH_DEPS: dict[str, tuple[str, ...]] = {
+    LAUNCH: (OPEN,),
+    "launch:launcher:exec-tmux": (LAUNCH,),
+    "launch:tmux:client-attached": ("launch:launcher:exec-tmux",),
+    "launch:tmux:cmd:start": ("launch:tmux:client-attached",),
+    NVIM_INIT: ("launch:tmux:cmd:start",),
+    "perf:User LazyDone": (NVIM_INIT,),
+    "perf:VimEnter": ("perf:User LazyDone",),
+    "perf:UIEnter": ("perf:VimEnter",),
+    "perf:nvim-tree:open:done": ("perf:VimEnter",),
+    "perf:toggleterm:startup:open_horizontal_in_win:begin": ("perf:User LazyDone", "perf:nvim-tree:open:done"),
+    "perf:toggleterm:startup:open_horizontal_in_win:done": ("perf:toggleterm:startup:open_horizontal_in_win:begin",),
+    "perf:toggleterm:term:spawn:begin": ("perf:toggleterm:startup:open_horizontal_in_win:done",),
+    "perf:toggleterm:term:spawn:done": ("perf:toggleterm:term:spawn:begin",),
+    "shell:toggleterm:zshenv:begin": ("perf:toggleterm:term:spawn:begin",),
+    "shell:toggleterm:zshenv:end": ("shell:toggleterm:zshenv:begin",),
+    "shell:toggleterm:zshrc:begin": ("shell:toggleterm:zshenv:end",),
+    "shell:toggleterm:zshrc:end_fast_init": ("shell:toggleterm:zshrc:begin",),
+    "shell:toggleterm:prompt:first": ("shell:toggleterm:zshrc:end_fast_init",),
+}
+
+
+def present_deps(markers: dict[str, float], node: str) -> set[str]:
+    """Dependencies of `node` that were logged, looking through missing ones to their own deps."""
+    out: set[str] = set()
+    for dep in CRITICAL_PATH_DEPS.get(node, ()):
+        if dep in markers:
+            out.add(dep)
+        else:
+            out |= present_deps(markers, dep)
+    return out
+
+
+def critical_path(markers: dict[str, float]) -> list[tuple[str, str, float]]:
+    """(from, to, ms) stages on the critical path to prompt ready, earliest first.
+
+    Walking back from the target, each marker's critical dependency is the one that
+    finished last; the stage's exclusive contribution is the wait after it.
+    """
+    node = resolve_marker(markers, PROMPT_READY)
+    path: list[tuple[str, str, float]] = []
+    while node is not None:
+        deps = present_deps(markers, node)
+        if not deps:
+            break
+        crit = max(deps, key=markers.__getitem__)
+        path.append((crit, node, markers[node] - markers[crit]))
+        node = crit
+    path.reverse()
+    return path
+
+
+def stage_name(start: str, end: str) -> str:
+    return f"{marker_name(start)} → {marker_name(end)}"
+
+
+def print_critical_path(index: LaunchIndex, launches: list[int], fmt: str) -> None:
+    paths = [(ts, critical_path(index.markers(ts))) for ts in launches]
+    paths = [(ts, path) for ts, path in paths if path]
+
+    contributions: dict[tuple[str, str], list[float]] = {}
+    total_ms = 0.0
+    for _ts, path in paths:
+        for start, end, ms in path:
+            contributions.setdefault((start, end), []).append(ms)
+            total_ms += ms
+    ranked = sorted(contributions.items(), key=lambda kv: sum(kv[1]), reverse=True)
+    share = (lambda ms: ms / total_ms) if total_ms else (lambda ms: 0.0)
+    by_process: dict[str, float] = {}
+    for (_start, end), values in ranked:
+        by_process[marker_process(end)] = by_process.get(marker_process(end), 0.0) + sum(values)
+
+    if fmt == "json":
+        data = {
+            "launches": len(paths),
+            "paths": {
+                str(ts): [{"from": a, "to": b, "ms": ms} for a, b, ms in path] for ts, path in paths
+            },
+            "stages": [
+                {
+                    "from": start,
+                    "to": end,
+                    "process": marker_process(end),
+                    "on_path": len(values),
+                    "p50_ms": percentile(sorted(values), 50),
+                    "mean_ms": sum(values) / len(values),
+                    "share": share(sum(values)),
+                }
+                for (start, end), values in ranked
+            ],
+            "processes": {k: share(v) for k, v in by_process.items()},
+        }
+        print(json.dumps(data, indent=2, ensure_ascii=False))
+        return
+
+    if len(paths) == 1:
+        ts, path = paths[0]
+        print(f"launch_ts_ns={ts}")
+        print("\n**critical path → prompt ready**")
+        for start, end, ms in path:
+            print(f"- {stage_name(start, end)}: {fmt_ms(ms)} ({share(ms):.0%})")
+        print(f"- total: {fmt_ms(total_ms)}")
+        return
+
+    print(f"launches={len(paths)} (critical path → prompt ready)")
+    if not paths:
+        return
+    print("\n**by process**")
+    for process, ms in sorted(by_process.items(), key=lambda kv: kv[1], reverse=True):
+        print(f"- {process}: {fmt_ms(ms / len(paths))} per launch ({share(ms):.0%})")
+    print()
+    print("| stage | process | on path | p50 | mean | share |")
+    print("|---|---|---|---|---|---|")
+    for (start, end), values in ranked:
+        print(
+            f"| {stage_name(start, end)} | {marker_process(end)} | {len(values)}/{len(paths)} "
+            f"| {fmt_ms(percentile(sorted(values), 50))} | {fmt_ms(sum(values) / len(values))} | {share(sum(values)):.1%} |"
+        )
+
+
+ARCHIVE_VERSION = 1
+# Launches this old are archived even if the logs never got all their markers.
+ARCHIVE_SETTLE_NS = 10 * 60 * 1_000_000_000
+
+
+def default_archive_dir() -> Path:
+    return Path(os.path.expanduser("~")) / ".local/state/humoodagen/ghostty-perf-archive"
+
+
+class LaunchArchive:
+    """Append-only columnar store of per-launch metrics.
+
+    Each column is a file of fixed-width native-endian values (`launch_ts_ns.q`,
+    `tmux_impl.H` as an index into the meta.json string table, one `<metric>.d`
+    float64 per metric with NaN for n/a). Rows are appended in launch order, so
+    the launch_ts_ns column doubles as the sorted index for range queries.
+    meta.json's row count is written last and is the source of truth.
+    """
+
+    def __init__(self, root: Path) -> None:
+        self.root = root
+        try:
+            meta = json.loads((root / "meta.json").read_text(encoding="utf-8"))
+        except (FileNotFoundError, ValueError):
+            meta = {}
+        if meta.get("version") != ARCHIVE_VERSION:
+            meta = {}
+        self.rows: int = meta.get("rows", 0)
+        self.metrics: list[str] = meta.get("metrics", [])
+        self.tmux_impls: list[str] = meta.get("tmux_impls", [])
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def column_path(self, name: str) -> Path:
+        if name == "launch_ts_ns":
+            return self.root / "launch_ts_ns.q"
+        if name == "tmux_impl":
+            return self.root / "tmux_impl.H"
+        return self.root / f"{name}.d"
+
+    def read_column(self, name: str, start: int, stop: int) -> array:
+        path = self.column_path(name)
+        values = array(path.suffix[1:])
+        count = max(0, min(stop, self.rows) - start)
+        if count == 0:
+            return values
+        if name not in ("launch_ts_ns", "tmux_impl") and name not in self.metrics:
+            return array("d", [math.nan]) * count
+        with path.open("rb") as f:
+            f.seek(start * values.itemsize)
+            values.fromfile(f, count)
+        return values
+
+    def last_launch_ts_ns(self) -> int | None:
+        return self.read_column("launch_ts_ns", self.rows - 1, self.rows)[0] if self.rows else None
+
+    def bisect(self, launch_ts_ns: int) -> int:
+        """First row whose launch_ts_ns >= `launch_ts_ns`, by binary search over the mmapped index column."""
+        if not self.rows:
+            return 0
+        # Map only the committed rows: an interrupted append may have left a partial one.
+        size = self.rows * array("q").itemsize
+        with self.column_path("launch_ts_ns").open("rb") as f, mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ) as mm:
+            with memoryview(mm) as mv, mv.cast("q") as ts:
+                return bisect.bisect_left(ts, launch_ts_ns, 0, self.rows)
+
+    def select(self, since_ns: int | None, last: int | None) -> tuple[int, int]:
+        start = self.bisect(since_ns) if since_ns is not None else 0
+        if last is not None:
+            start = max(start, self.rows - last) if last > 0 else self.rows
+        return start, self.rows
+
+    def append(self, records: list[LaunchMetrics]) -> int:
+        if not records:
+            return 0
+        self.root.mkdir(parents=True, exist_ok=True)
+        for key in METRIC_KEYS:
+            if key not in self.metrics:
+                # A metric added after rows were archived: backfill it as n/a.
+                with self.column_path(key).open("wb") as f:
+                    (array("d", [math.nan]) * self.rows).tofile(f)
+                self.metrics.append(key)
+
+        impl_ids = {name: i + 1 for i, name in enumerate(self.tmux_impls)}
+        columns: dict[str, array] = {"launch_ts_ns": array("q"), "tmux_impl": array("H")}
+        columns.update((key, array("d")) for key in self.metrics)
+        for m in records:
+            columns["launch_ts_ns"].append(m.launch_ts_ns)
+            if m.tmux_impl is not None and m.tmux_impl not in impl_ids:
+                self.tmux_impls.append(m.tmux_impl)
+                impl_ids[m.tmux_impl] = len(self.tmux_impls)
+            columns["tmux_impl"].append(impl_ids.get(m.tmux_impl, 0) if m.tmux_impl is not None else 0)
+            for key in self.metrics:
+                v = getattr(m, key, None) if key in METRIC_KEYS else None
+                columns[key].append(math.nan if v is None else v)
+
+        for name, values in columns.items():
+            with self.column_path(name).open("ab") as f:
+                # Drop any tail left behind by an interrupted append.
+                f.truncate(self.rows * values.itemsize)
+                values.tofile(f)
+        self.rows += len(records)
+        meta = {"version": ARCHIVE_VERSION, "rows": self.rows, "metrics": self.metrics, "tmux_impls": self.tmux_impls}
+        tmp = self.root / "meta.json.tmp"
+        tmp.write_text(json.dumps(meta, indent=2) + "\n", encoding="utf-8")
+        os.replace(tmp, self.root / "meta.json")
+        return len(records)
+
+    def records(self, start: int, stop: int) -> Iterator[LaunchMetrics]:
+        launch_ts = self.read_column("launch_ts_ns", start, stop)
+        impls = self.read_column("tmux_impl", start, stop)
+        columns = {key: self.read_column(key, start, stop) for key in METRIC_KEYS}
+        for i, launch_ts_ns in enumerate(launch_ts):
+            impl = self.tmux_impls[impls[i] - 1] if impls[i] else None
+            values = {key: None if math.isnan(v := col[i]) else v for key, col in columns.items()}
+            yield LaunchMetrics(launch_ts_ns, impl, **values)
+
+    def stats(self, start: int, stop: int) -> dict[str, MetricStats]:
+        out: dict[str, MetricStats] = {}
+        for key in METRIC_KEYS:
+            # NaN != NaN drops the n/a rows.
+            st = metric_stats([v for v in self.read_column(key, start, stop) if v == v])
+            if st is not None:
+                out[key] = st
+        return out
+
+
+def update_archive(archive: LaunchArchive, index: LaunchIndex) -> int:
+    """Append launches newer than the archive's last row, stopping at the first one still in progress.
+
+    Rows are never rewritten, so a recent launch waits until both the perf log and the
+    shell log have their last marker (either one alone may be ahead of the other).
+    """
+    last = archive.last_launch_ts_ns()
+    launches = index.launches()
+    if last is not None:
+        launches = launches[bisect.bisect_right(launches, last):]
+    cutoff = time.time_ns() - ARCHIVE_SETTLE_NS
+    index.preload(launches)
+    records: list[LaunchMetrics] = []
+    for launch_ts_ns in launches:
+        markers = index.markers(launch_ts_ns)
+        if launch_ts_ns > cutoff and not all(k in markers for k in LAUNCH_DONE_MARKERS):
+            break
+        records.append(next(iter_metrics(index, [launch_ts_ns])))
+    return archive.append(records)
+
+
+def load_baseline(path: Path) -> dict[str, float]:
+    data = json.loads(path.read_text(encoding="utf-8"))
+    return {k: float(v) for k, v in data.get("p50", {}).items()}
+
+
+def save_baseline(path: Path, stats: dict[str, MetricStats], launches: list[int]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    data = {
+        "launches": len(launches),
+        "first_launch_ts_ns": launches[0] if launches else None,
+        "last_launch_ts_ns": launches[-1] if launches else None,
+        "p50": {k: st.p50 for k, st in stats.items()},
+    }
+    path.write_text(json.dumps(data, indent=2) + "\n", encoding="utf-8")
+
+
+def print_stats(
+    launches: list[int],
+    stats: dict[str, MetricStats],
+    baseline: dict[str, float] | None,
+    threshold_pct: float,
+) -> list[str]:
+    """Print the per-metric distribution table; returns the keys that regressed against `baseline`."""
+    print(f"launches={len(launches)}")
+    if launches:
+        print(f"range: {launches[0]} … {launches[-1]}")
+    regressions: list[str] = []
+    regressed = set(regressions_against(stats, baseline, threshold_pct)) if baseline is not None else set()
+    header = "| metric | n | min | p50 | p90 | p99 | max |"
+    if baseline is not None:
+        header += " baseline p50 | Δp50 |"
+    print()
+    print(header)
+    print("|" + "---|" * (header.count("|") - 1))
+    for span in METRICS:
+        key, label = span.key, span.label
+        st = stats.get(key)
+        if st is None:
+            continue
+        row = f"| {label} | {st.count} | {fmt_ms(st.min)} | {fmt_ms(st.p50)} | {fmt_ms(st.p90)} | {fmt_ms(st.p99)} | {fmt_ms(st.max)} |"
+        if baseline is not None:
+            base = baseline.get(key)
+            if base is None:
+                row += " n/a | n/a |"
+            else:
+                delta = st.p50 - base
+                flag = ""
+                if key in regressed:
+                    regressions.append(key)
+                    flag = " ⚠ regression"
+                row += f" {fmt_ms(base)} | {delta:+.2f}ms{flag} |"
+        print(row)
+    if baseline is not None:
+        print()
+        if regressions:
+            labels = {span.key: span.label for span in METRICS}
+            print(f"Regressed (p50 > baseline by more than {threshold_pct:g}%): " + ", ".join(labels[k] for k in regressions))
+        else:
+            print(f"No p50 regressions beyond {threshold_pct:g}% of baseline.")
+    return regressions
+
+
+def default_tags_path() -> Path:
+    return Path.home() / ".local/state/humoodagen/ghostty-perf-tags.tsv"
+
+
+def load_tags(path: Path) -> list[tuple[int, str]]:
+    """(since_ns, tag) pairs sorted by time; each tag applies until the next one starts.
+
+    Lines are `<launch_ts_ns or ISO datetime>\t<tag>`; blank lines and `#` comments are skipped.
+    """
+    try:
+        text = path.read_text(encoding="utf-8")
+    except FileNotFoundError:
+        return []
+    tags: list[tuple[int, str]] = []
+    for line in text.splitlines():
+        if not line.strip() or line.startswith("#"):
+            continue
+        when, _, tag = line.partition("\t")
+        when = when.strip()
+        since_ns = int(when) if when.isdigit() else int(datetime.fromisoformat(when).timestamp() * 1e9)
+        tags.append((since_ns, tag.strip()))
+    tags.sort()
+    return tags
+
+
+def add_tag(path: Path, tag: str) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("a", encoding="utf-8") as f:
+        f.write(f"{time.time_ns()}\t{tag}\n")
+
+
+def tag_at(tags: list[tuple[int, str]], launch_ts_ns: int) -> str:
+    i = bisect.bisect_right(tags, (launch_ts_ns, "\uffff"))
+    return tags[i - 1][1] if i else "untagged"
+
+
+def group_launches(records: Iterable[LaunchMetrics], group_of: Callable[[LaunchMetrics], str]) -> dict[str, list[LaunchMetrics]]:
+    """Records by group, groups in order of their first launch (the first is the reference)."""
+    groups: dict[str, list[LaunchMetrics]] = {}
+    for m in sorted(records, key=lambda m: m.launch_ts_ns):
+        groups.setdefault(group_of(m), []).append(m)
+    return groups
+
+
+def median(values: list[float]) -> float:
+    return percentile(sorted(values), 50)
+
+
+def bootstrap_delta_ci(
+    ref: list[float], other: list[float], rounds: int, rng: random.Random, confidence: float = 0.95
+) -> tuple[float, float]:
+    """Percentile bootstrap interval for median(other) - median(ref)."""
+    deltas = sorted(
+        median(rng.choices(other, k=len(other))) - median(rng.choices(ref, k=len(ref))) for _ in range(rounds)
     )
-    launch_to_nvim_init_ms = nvim_init_start_launch_ms
+    tail = (1.0 - confidence) / 2 * 100
+    return percentile(deltas, tail), percentile(deltas, 100 - tail)
+
+
+def mann_whitney_p(a: list[float], b: list[float]) -> float:
+    """Two-sided Mann-Whitney U p-value (normal approximation, tie- and continuity-corrected)."""
+    n1, n2 = len(a), len(b)
+    n = n1 + n2
+    pooled = sorted([(v, 0) for v in a] + [(v, 1) for v in b])
+    rank_sum_a = 0.0
+    tie_term = 0.0
+    i = 0
+    while i < n:
+        j = i
+        while j + 1 < n and pooled[j + 1][0] == pooled[i][0]:
+            j += 1
+        avg_rank = (i + j) / 2 + 1
+        rank_sum_a += avg_rank * sum(1 for k in range(i, j + 1) if pooled[k][1] == 0)
+        t = j - i + 1
+        tie_term += t**3 - t
+        i = j + 1
+    u = rank_sum_a - n1 * (n1 + 1) / 2
+    mu = n1 * n2 / 2
+    sigma = math.sqrt(n1 * n2 / 12 * ((n + 1) - tie_term / (n * (n - 1))))
+    if sigma == 0:
+        return 1.0
+    z = (abs(u - mu) - 0.5) / sigma
+    return min(1.0, math.erfc(max(z, 0.0) / math.sqrt(2)))
+
+
+@dataclass(frozen=True)
+class MetricComparison:
+    key: str
+    n_ref: int
+    n: int
+    p50_ref: float
+    p50: float
+    delta: float
+    ci_low: float
+    ci_high: float
+    p_value: float
+
+    def significant(self, alpha: float) -> bool:
+        return self.p_value < alpha and (self.ci_low > 0 or self.ci_high < 0)
+
+
+def compare_groups(
+    ref: list[LaunchMetrics], other: list[LaunchMetrics], rounds: int, seed: int = 0
+) -> list[MetricComparison]:
+    """Per-metric median delta (other - ref) with a bootstrap CI and Mann-Whitney p-value."""
+    rng = random.Random(seed)
+    out: list[MetricComparison] = []
+    for key in METRIC_KEYS:
+        a = [v for m in ref if (v := m.get(key)) is not None]
+        b = [v for m in other if (v := m.get(key)) is not None]
+        if len(a) < 2 or len(b) < 2:
+            continue
+        p50_ref, p50 = median(a), median(b)
+        lo, hi = bootstrap_delta_ci(a, b, rounds, rng)
+        out.append(MetricComparison(key, len(a), len(b), p50_ref, p50, p50 - p50_ref, lo, hi, mann_whitney_p(a, b)))
+    return out
 
-    nvim_init_to_lazy_done_ms = (
-        (lazy_done.launch_ms - nvim_init_start_launch_ms) if lazy_done and isinstance(nvim_init_start_launch_ms, float) else None
+
+def print_compare(by: str, groups: dict[str, list[LaunchMetrics]], results: dict[str, list[MetricComparison]], alpha: float) -> None:
+    names = list(groups)
+    labels = {span.key: span.label for span in METRICS}
+    print(f"compare by {by}: " + ", ".join(f"{name} (n={len(groups[name])})" for name in names))
+    for name in names[1:]:
+        print()
+        print(f"### {name} vs {names[0]}")
+        print()
+        print("| metric | n | p50 | ref n | ref p50 | Δp50 | 95% CI | p (Mann-Whitney) |")
+        print("|" + "---|" * 8)
+        for c in results[name]:
+            flag = ""
+            if c.significant(alpha):
+                flag = " ⚠ slower" if c.delta > 0 else " ✓ faster"
+            print(
+                f"| {labels[c.key]} | {c.n} | {fmt_ms(c.p50)} | {c.n_ref} | {fmt_ms(c.p50_ref)} | {c.delta:+.2f}ms{flag} "
+                f"| [{c.ci_low:+.2f}, {c.ci_high:+.2f}] | {c.p_value:.3g} |"
+            )
+
+
+def emit_compare(args: argparse.Namespace, records: Iterable[LaunchMetrics]) -> int:
+    by: str = args.compare
+    if by == "tmux_impl":
+        group_of: Callable[[LaunchMetrics], str] = lambda m: m.tmux_impl or "unknown"  # noqa: E731
+    elif by == "tag":
+        tags = load_tags(args.tags.expanduser() if args.tags else default_tags_path())
+        group_of = lambda m: tag_at(tags, m.launch_ts_ns)  # noqa: E731
+    else:
+        split_ns = parse_since(by)
+        by = f"launches before/since {datetime.fromtimestamp(split_ns / 1e9).isoformat(timespec='minutes')}"
+        group_of = lambda m: "before" if m.launch_ts_ns < split_ns else "since"  # noqa: E731
+
+    groups = group_launches(records, group_of)
+    names = list(groups)
+    results = {name: compare_groups(groups[names[0]], groups[name], args.bootstrap) for name in names[1:]}
+    if args.format == "json":
+        data = {
+            "by": by,
+            "reference": names[0] if names else None,
+            "groups": {name: len(ms) for name, ms in groups.items()},
+            "comparisons": {
+                name: [{**asdict(c), "significant": c.significant(args.alpha)} for c in cs] for name, cs in results.items()
+            },
+        }
+        print(json.dumps(data, indent=2, ensure_ascii=False))
+    else:
+        if len(names) < 2:
+            print(f"compare by {by}: need at least two groups, found {', '.join(names) or 'none'}")
+            return 0
+        print_compare(by, groups, results, args.alpha)
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Summarize latest Ghostty→tmux→nvim→toggleterm cold-start timing.")
+    parser.add_argument("--launch", type=int, default=None, help="launch_ts_ns to report (defaults to latest in perf log)")
+    parser.add_argument("--last", type=int, default=None, metavar="N", help="summarize the last N launches (p50/p90/p99)")
+    parser.add_argument(
+        "--since",
+        type=parse_since,
+        default=None,
+        metavar="DATE",
+        help="summarize launches since DATE (ISO date/datetime, or an age like 7d/12h)",
     )
-    nvim_init_to_prompt_ms = (
-        (tt_stdout_first.launch_ms - nvim_init_start_launch_ms)
-        if tt_stdout_first and isinstance(nvim_init_start_launch_ms, float)
-        else None
+    parser.add_argument("--baseline", type=Path, default=None, help="flag metrics whose p50 regressed against this baseline JSON")
+    parser.add_argument("--save-baseline", type=Path, default=None, help="write the summarized p50s to this baseline JSON")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=10.0,
+        metavar="PCT",
+        help="regression threshold, percent of the baseline p50 (default: 10)",
     )
-    launch_to_prompt_ms = tt_stdout_first.launch_ms if tt_stdout_first else None
-    open_to_prompt_ms = (open_to_launcher_ms + launch_to_prompt_ms) if isinstance(open_to_launcher_ms, float) and isinstance(launch_to_prompt_ms, float) else None
-
-    tt_open_ms = (tt_open_done.launch_ms - tt_open_begin.launch_ms) if tt_open_begin and tt_open_done else None
-    tt_spawn_ms = (tt_spawn_done.launch_ms - tt_spawn_begin.launch_ms) if tt_spawn_begin and tt_spawn_done else None
-    tt_spawn_to_stdout_ms = (tt_stdout_first.launch_ms - tt_spawn_done.launch_ms) if tt_spawn_done and tt_stdout_first else None
-    tt_startup_done_to_stdout_ms = (tt_stdout_first.launch_ms - tt_startup_done.launch_ms) if tt_startup_done and tt_stdout_first else None
-    nvim_init_to_vim_enter_ms = (
-        (vim_enter.launch_ms - nvim_init_start_launch_ms) if vim_enter and isinstance(nvim_init_start_launch_ms, float) else None
+    parser.add_argument(
+        "--format",
+        choices=("text", "json", "ndjson", "csv"),
+        default="text",
+        help="output format (ndjson/csv: one record per launch)",
     )
-    nvim_init_to_ui_enter_ms = (
-        (ui_enter.launch_ms - nvim_init_start_launch_ms) if ui_enter and isinstance(nvim_init_start_launch_ms, float) else None
+    parser.add_argument(
+        "--compare",
+        default=None,
+        metavar="BY",
+        help=(
+            "compare launches (from --last/--since, default all) grouped by tmux_impl, tag, or a DATE/age "
+            "splitting them into before/since; reports per-metric median deltas vs the earliest group"
+        ),
     )
-    nvim_init_to_tree_open_ms = (
-        (tree_open_done.launch_ms - nvim_init_start_launch_ms)
-        if tree_open_done and isinstance(nvim_init_start_launch_ms, float)
-        else None
+    parser.add_argument("--tag", default=None, metavar="NAME", help="record that launches from now on belong to tag NAME")
+    parser.add_argument(
+        "--tags",
+        type=Path,
+        default=None,
+        help="tag file for --tag/--compare tag (default: ~/.local/state/humoodagen/ghostty-perf-tags.tsv)",
     )
-
-    zshenv_begin_ms = (
-        (shell_events.get("toggleterm:zshenv:begin") - launch_ts_ns) / 1e6
-        if shell_events.get("toggleterm:zshenv:begin")
-        else None
+    parser.add_argument("--bootstrap", type=int, default=1000, metavar="N", help="--compare bootstrap resamples (default: 1000)")
+    parser.add_argument("--alpha", type=float, default=0.05, help="--compare significance level (default: 0.05)")
+    parser.add_argument("--trace", type=Path, default=None, help="write a Chrome Trace Event / Perfetto JSON timeline here")
+    parser.add_argument("--folded", type=Path, default=None, help="write folded stacks (µs) for flamegraph.pl / speedscope here")
+    parser.add_argument(
+        "--critical-path",
+        action="store_true",
+        help="attribute open→prompt ready to the stages on its critical path (ranked across --last/--since)",
     )
-    zshenv_end_ms = (
-        (shell_events.get("toggleterm:zshenv:end") - launch_ts_ns) / 1e6
-        if shell_events.get("toggleterm:zshenv:end")
-        else None
+    parser.add_argument(
+        "--follow",
+        action="store_true",
+        help="keep tailing the logs and report each new launch once it reaches a prompt",
     )
-    zshenv_source_begin = shell_events.get("toggleterm:zshenv:source_orig:begin") or shell_events.get("toggleterm:zshenv:source_home:begin")
-    zshenv_source_done = shell_events.get("toggleterm:zshenv:source_orig:done") or shell_events.get("toggleterm:zshenv:source_home:done")
-    zshenv_source_ms = (zshenv_source_done - zshenv_source_begin) / 1e6 if zshenv_source_begin and zshenv_source_done else None
-
-    zshrc_begin_ms = (
-        (shell_events.get("toggleterm:zshrc:begin") - launch_ts_ns) / 1e6
-        if shell_events.get("toggleterm:zshrc:begin")
-        else None
+    parser.add_argument("--interval", type=float, default=0.25, help="--follow poll interval in seconds (default: 0.25)")
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=30.0,
+        help="--follow: report a launch as partial if it has no prompt after this many seconds (default: 30)",
     )
-    zshrc_end_fast_ms = (
-        (shell_events.get("toggleterm:zshrc:end_fast_init") - launch_ts_ns) / 1e6
-        if shell_events.get("toggleterm:zshrc:end_fast_init")
-        else None
+    parser.add_argument(
+        "--archive",
+        action="store_true",
+        help="append settled launches from the logs to the columnar archive",
     )
-
-    prompt_first_ms = (
-        (shell_events.get("toggleterm:prompt:first") - launch_ts_ns) / 1e6
-        if shell_events.get("toggleterm:prompt:first")
-        else None
+    parser.add_argument(
+        "--from-archive",
+        action="store_true",
+        help="answer --launch/--last/--since from the archive instead of parsing the logs",
     )
-    tmux_attach_ms = (
-        delta_ms(launch_ts_ns, tmux_client_attached_ts_ns if isinstance(tmux_client_attached_ts_ns, int) else None)
-        if isinstance(tmux_client_attached_ts_ns, int)
-        else None
+    parser.add_argument(
+        "--archive-dir",
+        type=Path,
+        default=None,
+        help="columnar archive location (default: ~/.local/state/humoodagen/ghostty-perf-archive)",
     )
+    parser.add_argument(
+        "--cache",
+        type=Path,
+        default=None,
+        help="incremental parse cache (default: ~/.local/state/humoodagen/ghostty-perf-report.cache)",
+    )
+    parser.add_argument("--no-cache", action="store_true", help="parse the logs from scratch without reading or writing the cache")
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        metavar="N",
+        help="split logs with more than 32 MiB left to parse across N processes (default: 1; 0 = one per CPU)",
+    )
+    args = parser.parse_args()
 
-    print(f"launch_ts_ns={launch_ts_ns}")
-    if isinstance(launch_events.get("tmux_impl"), str):
-        print(f"tmux_impl={launch_events['tmux_impl']}")
+    home = Path(os.path.expanduser("~"))
+    perf_log = home / ".local/state/nvim/humoodagen-perf.log"
+    launch_log = home / ".local/state/humoodagen/ghostty-launch.log"
+    shell_log = home / ".local/state/humoodagen/toggleterm-shell.log"
 
-    print("\n**Ghostty → launcher**")
-    print(f"- open→launcher: {fmt_ms(open_to_launcher_ms if isinstance(open_to_launcher_ms, float) else None)}")
-    print(f"- open→prompt stdout: {fmt_ms(open_to_prompt_ms)}")
-    print(f"- launch→prompt stdout: {fmt_ms(launch_to_prompt_ms)}")
-    prompt_ready_ms = prompt_first_ms if isinstance(prompt_first_ms, float) else tmux_attach_ms
-    if isinstance(open_to_launcher_ms, float) and isinstance(prompt_ready_ms, float):
-        print(f"- open→prompt ready: {fmt_ms(open_to_launcher_ms + prompt_ready_ms)}")
-    if isinstance(prompt_first_ms, float):
-        print(f"- launch→prompt ready: {fmt_ms(prompt_first_ms)}")
-    else:
-        print(f"- launch→prompt ready (tmux attach): {fmt_ms(tmux_attach_ms)}")
+    if args.tag:
+        tags_path = args.tags.expanduser() if args.tags else default_tags_path()
+        add_tag(tags_path, args.tag)
+        print(f"Tagged launches from now on as {args.tag!r} in {tags_path}")
+        return 0
+    if args.compare is not None:
+        if args.compare not in ("tmux_impl", "tag"):
+            try:
+                parse_since(args.compare)
+            except argparse.ArgumentTypeError:
+                parser.error(f"--compare expects tmux_impl, tag, or a DATE/age, not {args.compare!r}")
+        if args.format not in ("text", "json"):
+            parser.error("--compare supports --format text or json")
 
-    print("\n**launcher → tmux**")
-    print(f"- launcher→exec tmux: {fmt_ms(launcher_to_exec_tmux_ms)}")
-    exec_tmux_to_tmux_attach_ms = (
-        delta_ms(
-            launcher_exec_tmux_ts_ns if isinstance(launcher_exec_tmux_ts_ns, int) else None,
-            tmux_client_attached_ts_ns if isinstance(tmux_client_attached_ts_ns, int) else None,
-        )
-    )
-    launch_to_tmux_attach_ms = (
-        delta_ms(launch_ts_ns, tmux_client_attached_ts_ns if isinstance(tmux_client_attached_ts_ns, int) else None)
-    )
-    attach_to_cmd_start_ms = (
-        delta_ms(
-            tmux_client_attached_ts_ns if isinstance(tmux_client_attached_ts_ns, int) else None,
-            tmux_cmd_start_ts_ns if isinstance(tmux_cmd_start_ts_ns, int) else None,
+    cache_path = None if args.no_cache else (args.cache.expanduser() if args.cache else default_cache_path())
+    if args.follow:
+        if args.format not in ("text", "ndjson"):
+            parser.error("--follow supports --format text or ndjson")
+        return follow(
+            perf_log,
+            launch_log,
+            shell_log,
+            cache_path,
+            fmt=args.format,
+            interval=args.interval,
+            settle=max(args.interval, 0.5),
+            timeout=args.timeout,
         )
-    )
-    print(f"- exec tmux→client attached: {fmt_ms(exec_tmux_to_tmux_attach_ms)}")
-    print(f"- launch→client attached: {fmt_ms(launch_to_tmux_attach_ms)}")
-    print(f"- exec tmux→tmux cmd start: {fmt_ms(exec_tmux_to_tmux_cmd_ms)}")
-    print(f"- client attached→tmux cmd start: {fmt_ms(attach_to_cmd_start_ms)}")
-    print(f"- tmux cmd start→nvim init start: {fmt_ms(tmux_cmd_to_nvim_init_ms)}")
-    print(f"- launch→nvim init start: {fmt_ms(launch_to_nvim_init_ms)}")
 
-    print("\n**nvim (from init.lua start)**")
-    if not perf_enabled or not isinstance(nvim_init_start_launch_ms, float):
-        print("- nvim init: n/a (session reused or perf markers missing)")
+    archive_dir = args.archive_dir.expanduser() if args.archive_dir else default_archive_dir()
+    multi = args.last is not None or args.since is not None or args.baseline or args.save_baseline or args.compare
+    records: Callable[[], Iterable[LaunchMetrics]]
+    stats_of: Callable[[], dict[str, MetricStats]]
+
+    if args.from_archive:
+        if args.critical_path or args.trace or args.folded:
+            parser.error("--critical-path/--trace/--folded need the raw logs, not --from-archive")
+        archive = LaunchArchive(archive_dir)
+        if multi:
+            start, stop = archive.select(args.since, args.last)
+        elif args.launch:
+            start = archive.bisect(args.launch)
+            stop = start + 1
+            if start >= len(archive) or archive.read_column("launch_ts_ns", start, stop)[0] != args.launch:
+                print(f"launch_ts_ns={args.launch} is not in {archive_dir}", file=sys.stderr)
+                return 1
+        else:
+            start, stop = max(0, len(archive) - 1), len(archive)
+        if not multi and start >= stop:
+            print(f"No archived launches in {archive_dir}", file=sys.stderr)
+            return 1
+        launches = list(archive.read_column("launch_ts_ns", start, stop))
+        records = lambda: archive.records(start, stop)  # noqa: E731
+        stats_of = lambda: archive.stats(start, stop)  # noqa: E731
+        return emit_metrics(args, multi, launches, records, stats_of)
+
+    jobs = args.jobs if args.jobs > 0 else os.cpu_count() or 1
+    index = build_index(perf_log, launch_log, shell_log, cache_path, jobs=jobs)
+
+    if args.archive:
+        archive = LaunchArchive(archive_dir)
+        added = update_archive(archive, index)
+        print(f"Archived: {added} new launches ({len(archive)} total) in {archive_dir}")
+        return 0
+
+    if multi:
+        launches = select_launches(index, args.since, args.last)
     else:
-        print(f"- init→LazyDone: {fmt_ms(nvim_init_to_lazy_done_ms)}")
-        print(f"- init→VimEnter: {fmt_ms(nvim_init_to_vim_enter_ms)}")
-        print(f"- init→UIEnter: {fmt_ms(nvim_init_to_ui_enter_ms)}")
-        print(f"- init→nvim-tree open done: {fmt_ms(nvim_init_to_tree_open_ms)}")
-        print(f"- toggleterm open window: {fmt_ms(tt_open_ms)}")
-        print(f"- toggleterm spawn call: {fmt_ms(tt_spawn_ms)}")
-        if tt_startup_done:
-            print(f"- init→toggleterm startup done: {fmt_ms(tt_startup_done.launch_ms - nvim_init_start_launch_ms)}")
-            print(f"- toggleterm startup done→stdout:first: {fmt_ms(tt_startup_done_to_stdout_ms)}")
-        print(f"- toggleterm spawn done→stdout:first: {fmt_ms(tt_spawn_to_stdout_ms)}")
-        print(f"- init→first toggleterm stdout: {fmt_ms(nvim_init_to_prompt_ms)}")
+        launch_ts_ns = args.launch or index.latest_launch_ts_ns()
+        if not launch_ts_ns:
+            print(f"Could not find a launch_ts_ns in {perf_log}", file=sys.stderr)
+            return 1
+        launches = [launch_ts_ns]
+    index.preload(launches)
 
-    print("\n**zsh (toggleterm shell)**")
-    print(f"- zshenv begin: {fmt_ms(zshenv_begin_ms)}")
-    print(f"- zshenv source (.zshenv): {fmt_ms(zshenv_source_ms)}")
-    if zshenv_begin_ms is not None and zshenv_end_ms is not None:
-        print(f"- zshenv total: {fmt_ms(zshenv_end_ms - zshenv_begin_ms)}")
-    print(f"- zshrc begin: {fmt_ms(zshrc_begin_ms)}")
-    print(f"- first prompt (precmd): {fmt_ms(prompt_first_ms)}")
-    if zshrc_begin_ms is not None and zshrc_end_fast_ms is not None:
-        print(f"- zshrc fast-init body: {fmt_ms(zshrc_end_fast_ms - zshrc_begin_ms)}")
+    if args.critical_path:
+        if args.format not in ("text", "json"):
+            parser.error("--critical-path supports --format text or json")
+        print_critical_path(index, launches, args.format)
+        return 0
 
-    return 0
+    if args.trace or args.folded:
+        if args.trace:
+            write_trace(args.trace.expanduser(), index, launches)
+            print(f"Wrote: {args.trace} ({len(launches)} launches)")
+        if args.folded:
+            write_folded(args.folded.expanduser(), index, launches)
+            print(f"Wrote: {args.folded} ({len(launches)} launches)")
+        return 0
+
+    records = lambda: iter_metrics(index, launches)  # noqa: E731
+    stats_of = lambda: summarize(list(records()))  # noqa: E731
+    return emit_metrics(args, multi, launches, records, stats_of)
+
+
+def emit_metrics(
+    args: argparse.Namespace,
+    multi: bool,
+    launches: list[int],
+    records: Callable[[], Iterable[LaunchMetrics]],
+    stats_of: Callable[[], dict[str, MetricStats]],
+) -> int:
+    if args.format == "ndjson":
+        write_ndjson(records(), sys.stdout)
+        return 0
+    if args.format == "csv":
+        write_csv(records(), sys.stdout)
+        return 0
+
+    if args.compare is not None:
+        return emit_compare(args, records())
+
+    if not multi:
+        m = next(iter(records()))
+        if args.format == "json":
+            print(json.dumps(m.to_dict(), indent=2, ensure_ascii=False))
+        else:
+            print_report(m)
+        return 0
+
+    stats = stats_of()
+    baseline = load_baseline(args.baseline.expanduser()) if args.baseline else None
+    if args.format == "json":
+        regressions = regressions_against(stats, baseline, args.threshold) if baseline is not None else []
+        data = {
+            "launches": [m.to_dict() for m in records()],
+            "stats": stats_to_dict(stats),
+            "regressions": regressions,
+        }
+        print(json.dumps(data, indent=2, ensure_ascii=False))
+    else:
+        regressions = print_stats(launches, stats, baseline, args.threshold)
+    if args.save_baseline:
+        save_baseline(args.save_baseline.expanduser(), stats, launches)
+    return 1 if regressions else 0
 
 
 if __name__ == "__main__":
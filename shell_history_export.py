@@ -3,11 +3,28 @@
 from __future__ import annotations
 
 import argparse
+import glob
+import hashlib
+import heapq
+import json
+import math
+import mmap
+import os
 import re
+import resource
+import shlex
 import shutil
+import sqlite3
 import sys
 import time
+import tracemalloc
+from collections import deque
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager, nullcontext
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from itertools import islice
 from pathlib import Path
+from typing import NamedTuple, TextIO
 
 
 def _default_shell_history_path() -> Path:
@@ -18,78 +35,533 @@ def _default_export_path() -> Path:
     return Path.home() / ".dotfiles" / "history" / "shell_history_sanitized.txt"
 
 
-def _compile_sensitive_patterns() -> list[re.Pattern[str]]:
-    patterns = [
-        # Common "secret in command" cases.
-        r"(?i)\bauthorization\s*:\s*bearer\b",
-        r"(?i)\bbearer\s+[A-Za-z0-9\-_\.=]{10,}",
-        r"(?i)\b(x-api-key|api[-_]?key|apikey)\b\s*[:=]",
+# (pattern, literals any match must contain). The literals feed a cheap prefilter,
+# so keep them in sync when editing a pattern.
+_SENSITIVE_PATTERNS: list[tuple[str, tuple[str, ...]]] = [
+    # Common "secret in command" cases.
+    (r"(?i)\bauthorization\s*:\s*bearer\b", ("bearer",)),
+    (r"(?i)\bbearer\s+[A-Za-z0-9\-_\.=]{10,}", ("bearer",)),
+    (r"(?i)\b(x-api-key|api[-_]?key|apikey)\b\s*[:=]", ("api",)),
+    (
         r"(?i)\b(--?(token|auth-token|access-token|refresh-token|client-secret|api[-_]?key|password|passwd))\b",
-        # Env var assignments that likely contain secrets.
-        r"(?i)\b([A-Z0-9_]*(TOKEN|SECRET|PASSWORD|PASSWD|API_KEY|APIKEY|KEY)[A-Z0-9_]*)\s*=",
-        # Known token/key formats (best-effort).
-        r"\bsk-[A-Za-z0-9._=-]{20,}\b",  # OpenAI (best-effort; covers sk-... and sk-proj-...)
-        r"\bghp_[A-Za-z0-9]{20,}\b",  # GitHub classic token
-        r"\bgithub_pat_[A-Za-z0-9_]{20,}\b",  # GitHub fine-grained
-        r"\bxox[baprs]-[A-Za-z0-9-]{10,}\b",  # Slack
-        r"\bAIza[0-9A-Za-z\-_]{20,}\b",  # Google API key
-        r"\bya29\.[0-9A-Za-z\-_]+\b",  # Google OAuth token
-        r"(?i)-----BEGIN (RSA|OPENSSH|EC|DSA) PRIVATE KEY-----",
-    ]
-    return [re.compile(p) for p in patterns]
-
-
-def _looks_sensitive(command: str, sensitive_patterns: list[re.Pattern[str]]) -> bool:
-    if len(command) > 2000:
+        ("token", "secret", "key", "pass"),
+    ),
+    # Env var assignments that likely contain secrets.
+    (r"(?i)\b([A-Z0-9_]*(TOKEN|SECRET|PASSWORD|PASSWD|API_KEY|APIKEY|KEY)[A-Z0-9_]*)\s*=", ("token", "secret", "pass", "key")),
+    # Known token/key formats (best-effort).
+    (r"\bsk-[A-Za-z0-9._=-]{20,}\b", ("sk-",)),  # OpenAI (best-effort; covers sk-... and sk-proj-...)
+    (r"\bghp_[A-Za-z0-9]{20,}\b", ("ghp_",)),  # GitHub classic token
+    (r"\bgithub_pat_[A-Za-z0-9_]{20,}\b", ("github_pat_",)),  # GitHub fine-grained
+    (r"\bxox[baprs]-[A-Za-z0-9-]{10,}\b", ("xox",)),  # Slack
+    (r"\bAIza[0-9A-Za-z\-_]{20,}\b", ("AIza",)),  # Google API key
+    (r"\bya29\.[0-9A-Za-z\-_]+\b", ("ya29.",)),  # Google OAuth token
+    (r"(?i)-----BEGIN (RSA|OPENSSH|EC|DSA) PRIVATE KEY-----", ("private key",)),
+]
+
+_MAX_COMMAND_LENGTH = 2000
+
+
+def _compile_sensitive_patterns() -> list[re.Pattern[str]]:
+    return [re.compile(p) for p, _literals in _SENSITIVE_PATTERNS]
+
+
+class _SensitiveMatcher:
+    """Decides whether a command looks like it contains a secret.
+
+    One combined case-insensitive search for the patterns' literals rejects most
+    commands; the full regexes only run for patterns whose literals are present.
+    Verdicts are memoized per command, so repeated commands are scanned once, and
+    `hits` counts drops per reason (pattern source or "too long").
+    """
+
+    def __init__(self, sensitive_patterns: list[re.Pattern[str]]) -> None:
+        self._checks: list[tuple[re.Pattern[str], re.Pattern[str]]] = []
+        for pattern, (_source, literals) in zip(sensitive_patterns, _SENSITIVE_PATTERNS):
+            flags = re.IGNORECASE if pattern.flags & re.IGNORECASE else 0
+            self._checks.append((re.compile("|".join(map(re.escape, literals)), flags), pattern))
+        literals = sorted({lit for _source, lits in _SENSITIVE_PATTERNS for lit in lits})
+        self._prefilter = re.compile("|".join(map(re.escape, literals)), re.IGNORECASE)
+        self._verdicts: dict[str, str | None] = {}
+        self.hits: dict[str, int] = {}
+
+    def scan(self, command: str) -> str | None:
+        if len(command) > _MAX_COMMAND_LENGTH:
+            return "too long"
+        if not self._prefilter.search(command):
+            return None
+        for literals, pattern in self._checks:
+            if literals.search(command) and pattern.search(command):
+                return pattern.pattern
+        return None
+
+    def unseen(self, commands: Iterable[str]) -> list[str]:
+        """The distinct commands in `commands` that have no memoized verdict yet."""
+        return [cmd for cmd in dict.fromkeys(commands) if cmd not in self._verdicts]
+
+    def prime(self, commands: list[str], verdicts: list[str | None]) -> None:
+        """Memoize verdicts computed elsewhere (e.g. by `_scan_chunk` in a worker)."""
+        self._verdicts.update(zip(commands, verdicts))
+
+    def verdict(self, command: str) -> str | None:
+        """Memoized `scan`, not counted in `hits`."""
+        try:
+            return self._verdicts[command]
+        except KeyError:
+            verdict = self._verdicts[command] = self.scan(command)
+            return verdict
+
+    def reason(self, command: str) -> str | None:
+        """Why `command` is dropped (counted in `hits`), or None if it is safe to export."""
+        verdict = self.verdict(command)
+        if verdict is not None:
+            self.hits[verdict] = self.hits.get(verdict, 0) + 1
+        return verdict
+
+
+# Below this many bytes of history that will actually be read, --jobs stays serial:
+# spawning workers costs more than scanning the commands in-process.
+_PARALLEL_MIN_BYTES = 16 << 20
+_CHUNK_COMMANDS = 20000
+
+_worker_matcher: _SensitiveMatcher | None = None
+
+
+def _init_worker() -> None:
+    global _worker_matcher
+    _worker_matcher = _SensitiveMatcher(_compile_sensitive_patterns())
+
+
+def _scan_chunk(commands: list[str]) -> list[str | None]:
+    assert _worker_matcher is not None
+    return [_worker_matcher.scan(cmd) for cmd in commands]
+
+
+def _prescanned(commands: Iterable[str], matcher: _SensitiveMatcher, executor: Executor, lookahead: int) -> Iterator[str]:
+    """Pass `commands` through unchanged, having workers scan them ahead of the consumer.
+
+    Chunks are scanned at most `lookahead` ahead and yielded in their original order,
+    each only after its verdicts are primed into `matcher`, so `matcher.reason` never
+    scans in-process and a consumer that stops early leaves little work behind.
+    """
+    it = iter(commands)
+    pending: deque[tuple[list[str], list[str], Future[list[str | None]] | None]] = deque()
+
+    def submit() -> bool:
+        chunk = list(islice(it, _CHUNK_COMMANDS))
+        if not chunk:
+            return False
+        todo = matcher.unseen(chunk)
+        pending.append((chunk, todo, executor.submit(_scan_chunk, todo) if todo else None))
         return True
-    for pattern in sensitive_patterns:
-        if pattern.search(command):
-            return True
-    return False
 
+    while len(pending) < lookahead and submit():
+        pass
+    while pending:
+        chunk, todo, future = pending.popleft()
+        submit()
+        if future is not None:
+            matcher.prime(todo, future.result())
+        yield from chunk
+
+
+# zsh "metafies" history bytes: Meta (0x83) followed by c stands for the byte c ^ 0x20.
+_META = 0x83
+
+
+def _unmetafy(raw: bytes) -> bytes:
+    if _META not in raw:
+        return raw
+    out = bytearray()
+    it = iter(raw)
+    for b in it:
+        if b == _META:
+            b = next(it, _META ^ 0x20) ^ 0x20
+        out.append(b)
+    return bytes(out)
+
+
+def _decode_line(raw: bytes) -> str:
+    return _unmetafy(raw).decode("utf-8", errors="replace").rstrip("\n").rstrip("\r").replace("\0", "")
 
-def _parse_history_lines(lines: list[str]) -> list[str]:
-    commands: list[str] = []
 
+def _is_header(line: str) -> bool:
+    # Extended history: ": <epoch>:<duration>;<command>"
+    return line.startswith(": ") and ";" in line
+
+
+_HEADER_RE = re.compile(r": *(\d+):(\d+);")
+
+
+class _HistoryRecord(NamedTuple):
+    timestamp: int | None  # None for plain (non-extended) history lines
+    duration: int
+    command: str
+
+
+def _parse_header(line: str) -> tuple[int | None, int]:
+    """(timestamp, duration) of an extended-history line, or (None, 0)."""
+    m = _HEADER_RE.match(line)
+    if m is None:
+        return None, 0
+    return int(m.group(1)), int(m.group(2))
+
+
+def _count_merge(counters: dict[str, int] | None) -> None:
+    if counters is not None:
+        counters["continuation_merges"] = counters.get("continuation_merges", 0) + 1
+
+
+def _parse_history_records(lines: Iterable[str], counters: dict[str, int] | None = None) -> Iterator[_HistoryRecord]:
     buffer = ""
+    first = ""
     for raw in lines:
         line = raw.rstrip("\n").rstrip("\r").replace("\0", "")
 
-        if line.startswith(": ") and ";" in line:
+        if _is_header(line):
             cmd = line.split(";", 1)[1]
             if buffer:
-                commands.append(buffer)
+                yield _HistoryRecord(*_parse_header(first), buffer)
                 buffer = ""
         else:
             cmd = line
 
+        if not buffer:
+            first = line
         buffer = f"{buffer}{cmd}" if buffer else cmd
         if buffer.endswith("\\"):
             buffer = buffer[:-1]
+            _count_merge(counters)
             continue
 
         if buffer.strip():
-            commands.append(buffer)
+            yield _HistoryRecord(*_parse_header(first), buffer)
         buffer = ""
 
     if buffer.strip():
-        commands.append(buffer)
+        yield _HistoryRecord(*_parse_header(first), buffer)
+
+
+def _parse_history_lines(lines: Iterable[str], counters: dict[str, int] | None = None) -> Iterator[str]:
+    for record in _parse_history_records(lines, counters):
+        yield record.command
+
+
+def _join_command(lines: list[str]) -> str:
+    parts: list[str] = []
+    for i, line in enumerate(lines):
+        if i == 0 and _is_header(line):
+            line = line.split(";", 1)[1]
+        parts.append(line[:-1] if line.endswith("\\") else line)
+    return "".join(parts)
+
+
+def _history_record(lines: list[str]) -> _HistoryRecord:
+    return _HistoryRecord(*_parse_header(lines[0]), _join_command(lines))
+
+
+def _entries_reversed(lines: Iterable[str], counters: dict[str, int] | None = None) -> Iterator[list[str]]:
+    """The lines of each history entry, newest entry first, from lines fed newest first.
+
+    A line ending in a backslash continues onto the next one, unless that next line
+    starts a new extended-history entry.
+    """
+    pending: deque[str] = deque()
+    for line in lines:
+        if pending and line.endswith("\\") and not _is_header(pending[0]):
+            pending.appendleft(line)
+            _count_merge(counters)
+            continue
+        if pending:
+            yield list(pending)
+        pending = deque((line,))
+    if pending:
+        yield list(pending)
+
+
+def _parse_history_lines_reversed(lines: Iterable[str], counters: dict[str, int] | None = None) -> Iterator[str]:
+    """The commands of `_parse_history_lines`, newest first, from lines fed newest first."""
+    for entry in _entries_reversed(lines, counters):
+        cmd = _join_command(entry)
+        if cmd.strip():
+            yield cmd
+
+
+def _parse_history_records_reversed(
+    lines: Iterable[str], counters: dict[str, int] | None = None
+) -> Iterator[_HistoryRecord]:
+    """Like `_parse_history_lines_reversed`, keeping each entry's timestamp and duration."""
+    for entry in _entries_reversed(lines, counters):
+        record = _history_record(entry)
+        if record.command.strip():
+            yield record
+
+
+class _Profile:
+    """Per-stage wall time, item counts and (optionally) peak traced memory for one export.
+
+    Stages nest (sanitize pulls from parse, which pulls from read), so each stage is
+    charged only the time its own code ran. With `trace_memory`, a stage's peak is the
+    tracemalloc peak while its own code ran; tracing slows every stage several-fold,
+    so only compare runs made the same way.
+    """
+
+    def __init__(self, *, trace_memory: bool = False) -> None:
+        self.stages: dict[str, dict[str, float]] = {}
+        self.counters: dict[str, int] = {}
+        self.peak_bytes = 0
+        self._trace_memory = trace_memory
+        self._child_time: list[float] = []
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self._started = time.perf_counter()
+
+    def _enter(self) -> float:
+        self._child_time.append(0.0)
+        return time.perf_counter()
+
+    def _exit(self, name: str, t0: float, items: int) -> None:
+        elapsed = time.perf_counter() - t0
+        own = elapsed - self._child_time.pop()
+        if self._child_time:
+            self._child_time[-1] += elapsed
+        stage = self.stages.setdefault(name, {"wall_s": 0.0, "items": 0, "peak_bytes": 0})
+        stage["wall_s"] += own
+        stage["items"] += items
+        if self._trace_memory:
+            _current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            stage["peak_bytes"] = max(stage["peak_bytes"], peak)
+            self.peak_bytes = max(self.peak_bytes, peak)
+
+    def stage(self, name: str, items: Iterable):
+        """Pass `items` through, charging the time spent producing each one to `name`."""
+        it = iter(items)
+        while True:
+            t0 = self._enter()
+            try:
+                item = next(it)
+            except StopIteration:
+                self._exit(name, t0, 0)
+                return
+            self._exit(name, t0, 1)
+            yield item
 
-    return commands
+    @contextmanager
+    def block(self, name: str) -> Iterator[None]:
+        t0 = self._enter()
+        try:
+            yield
+        finally:
+            self._exit(name, t0, 0)
 
+    def count(self, name: str, items: Iterable):
+        for item in items:
+            self.counters[name] = self.counters.get(name, 0) + 1
+            yield item
 
-def _read_commands(path: Path) -> list[str]:
+    def to_dict(self) -> dict:
+        wall_s = time.perf_counter() - self._started
+        lines = int(self.stages.get("read", {}).get("items", 0))
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return {
+            "wall_s": round(wall_s, 6),
+            # ru_maxrss is in bytes on macOS and KiB on Linux.
+            "max_rss_bytes": max_rss if sys.platform == "darwin" else max_rss * 1024,
+            "peak_bytes": self.peak_bytes if self._trace_memory else None,
+            "lines": lines,
+            "lines_per_s": round(lines / wall_s, 1) if wall_s > 0 else None,
+            "stages": {
+                name: {
+                    "wall_s": round(stage["wall_s"], 6),
+                    "items": int(stage["items"]),
+                    "peak_bytes": int(stage["peak_bytes"]) if self._trace_memory else None,
+                }
+                for name, stage in self.stages.items()
+            },
+        }
+
+
+def _profiled_lines(lines: Iterable[str], profile: _Profile | None) -> Iterable[str]:
+    return lines if profile is None else profile.stage("read", lines)
+
+
+def _profiled_parse(items: Iterable, profile: _Profile | None) -> Iterable:
+    return items if profile is None else profile.stage("parse", items)
+
+
+def _iter_raw_lines(path: Path, start: int = 0, end: int | None = None) -> Iterator[bytes]:
+    with path.open("rb") as f:
+        f.seek(start)
+        pos = start
+        for raw in f:
+            if end is not None and pos >= end:
+                return
+            pos += len(raw)
+            yield raw
+
+
+def _iter_raw_lines_reversed(path: Path, end: int | None = None) -> Iterator[bytes]:
+    """Lines of `path[:end]` from last to first, read through mmap so only touched pages are loaded."""
+    with path.open("rb") as f:
+        size = os.fstat(f.fileno()).st_size if end is None else end
+        if size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            end = size - 1 if mm[size - 1] == ord("\n") else size
+            while True:
+                start = mm.rfind(b"\n", 0, end) + 1
+                yield mm[start:end]
+                if start == 0:
+                    return
+                end = start - 1
+
+
+def _command_boundary(path: Path) -> int:
+    """Offset just past the last complete command.
+
+    zsh may still be appending: a final line without a newline, or one ending in a
+    backslash continuation, is left for the next run.
+    """
+    with path.open("rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return 0
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            nl = mm.rfind(b"\n", 0, size)
+            while nl >= 0:
+                line_end = nl - 1 if nl > 0 and mm[nl - 1] == ord("\r") else nl
+                if line_end == 0 or mm[line_end - 1] != ord("\\"):
+                    return nl + 1
+                nl = mm.rfind(b"\n", 0, nl)
+    return 0
+
+
+def _dated_boundary(path: Path, start: int, end: int) -> int:
+    """`end`, pulled back to where a trailing run of commands without a timestamp begins.
+
+    `_iter_records` dates such commands like the next timestamped one, which zsh has
+    not written yet, so like a partial line they are left for the next run. A history
+    that does not start with a timestamp (plain history, a sanitized snapshot) keeps `end`.
+    """
+    if start >= end:
+        return end
+    with path.open("rb") as f:
+        if not _HEADER_RE.match(_decode_line(f.readline())):
+            return end
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            line_end = end
+            while line_end > start:
+                line_start = max(start, mm.rfind(b"\n", start, line_end - 1) + 1)
+                if _HEADER_RE.match(_decode_line(mm[line_start:line_end])):
+                    # The last dated command, including any continuation lines.
+                    pos = line_start
+                    while (nl := mm.find(b"\n", pos, end)) >= 0:
+                        if not mm[pos:nl].rstrip(b"\r").endswith(b"\\"):
+                            return nl + 1
+                        pos = nl + 1
+                    return end
+                line_end = line_start
+    return start
+
+
+def _iter_commands(path: Path, start: int = 0, end: int | None = None, profile: _Profile | None = None) -> Iterator[str]:
+    if not path.exists():
+        return
+    lines = _profiled_lines((_decode_line(raw) for raw in _iter_raw_lines(path, start, end)), profile)
+    counters = None if profile is None else profile.counters
+    for cmd in _profiled_parse(_parse_history_lines(lines, counters), profile):
+        if cmd.strip():
+            yield cmd.strip()
+
+
+def _iter_records(path: Path, start: int = 0, end: int | None = None) -> Iterator[_HistoryRecord]:
+    """Records of `path[start:end]`, oldest first.
+
+    As in `_iter_records_reversed`, a command without a timestamp is dated like the
+    next newer one (or the file's mtime), so it is held back until that one is read.
+    """
+    if not path.exists():
+        return
+    undated: list[_HistoryRecord] = []
+    for record in _parse_history_records(_decode_line(raw) for raw in _iter_raw_lines(path, start, end)):
+        cmd = record.command.strip()
+        if not cmd:
+            continue
+        if record.timestamp is None:
+            undated.append(_HistoryRecord(None, record.duration, cmd))
+            continue
+        for held in undated:
+            yield held._replace(timestamp=record.timestamp)
+        undated.clear()
+        yield _HistoryRecord(record.timestamp, record.duration, cmd)
+    mtime = int(path.stat().st_mtime)
+    for held in undated:
+        yield held._replace(timestamp=mtime)
+
+
+def _iter_records_reversed(
+    path: Path, end: int | None = None, profile: _Profile | None = None
+) -> Iterator[_HistoryRecord]:
+    """Records of `path`, newest first, with non-decreasing age.
+
+    A command without a usable timestamp is dated like the next newer one (or the
+    file's mtime), and out-of-order timestamps are clamped, so the stream stays
+    sorted for `_merge_newest_first`.
+    """
+    if not path.exists():
+        return
+    newer = int(path.stat().st_mtime)
+    lines = _profiled_lines((_decode_line(raw) for raw in _iter_raw_lines_reversed(path, end)), profile)
+    counters = None if profile is None else profile.counters
+    for record in _profiled_parse(_parse_history_records_reversed(lines, counters), profile):
+        cmd = record.command.strip()
+        if not cmd:
+            continue
+        if record.timestamp is not None and record.timestamp <= newer:
+            newer = record.timestamp
+        yield _HistoryRecord(newer, record.duration, cmd)
+
+
+def _iter_commands_reversed(path: Path, end: int | None = None, profile: _Profile | None = None) -> Iterator[str]:
     if not path.exists():
-        return []
-    text = path.read_text(encoding="utf-8", errors="replace")
-    return [line.strip() for line in _parse_history_lines(text.splitlines(keepends=True)) if line.strip()]
+        return
+    lines = _profiled_lines((_decode_line(raw) for raw in _iter_raw_lines_reversed(path, end)), profile)
+    counters = None if profile is None else profile.counters
+    for cmd in _profiled_parse(_parse_history_lines_reversed(lines, counters), profile):
+        if cmd.strip():
+            yield cmd.strip()
 
 
-def _recent_unique(commands: list[str], max_unique: int) -> list[str]:
+def _merge_newest_first(paths: list[Path], profile: _Profile | None = None) -> Iterator[_HistoryRecord]:
+    """K-way merge of several histories by timestamp, newest first.
+
+    Each source is streamed backwards, so memory is bounded by the number of sources.
+    Ties keep the order of `paths`.
+    """
+    sources = (_iter_records_reversed(p, profile=profile) for p in paths)
+    merged = heapq.merge(*sources, key=lambda r: r.timestamp, reverse=True)
+    return merged if profile is None else profile.stage("merge", merged)
+
+
+def _expand_sources(specs: list[str]) -> list[Path]:
+    """Files named by `specs`, with `~` and glob patterns expanded, each once, in order."""
+    paths: dict[Path, None] = {}
+    for spec in specs:
+        spec = os.path.expanduser(spec)
+        matches = sorted(glob.glob(spec)) if glob.has_magic(spec) else [spec]
+        if not matches:
+            print(f"warning: no history files match {spec}", file=sys.stderr)
+        for match in matches:
+            paths.setdefault(Path(match), None)
+    return list(paths)
+
+
+def _recent_unique(commands_newest_first: Iterable[str], max_unique: int) -> list[str]:
+    """Most recent occurrence of each command, oldest first; stops pulling input once `max_unique` are kept."""
     seen: set[str] = set()
     out_reversed: list[str] = []
 
-    for cmd in reversed(commands):
+    for cmd in commands_newest_first:
         if cmd in seen:
             continue
         seen.add(cmd)
@@ -100,33 +572,569 @@ def _recent_unique(commands: list[str], max_unique: int) -> list[str]:
     return list(reversed(out_reversed))
 
 
-def _write_lines(path: Path, lines: list[str], *, backup: bool) -> None:
+_STATE_VERSION = 1
+_TAIL_DIGEST_BYTES = 4096
+
+
+def _state_path(out_path: Path) -> Path:
+    return out_path.with_suffix(".state.json")
+
+
+def _sha256_file(path: Path) -> str | None:
+    try:
+        with path.open("rb") as f:
+            digest = hashlib.sha256()
+            while chunk := f.read(1 << 20):
+                digest.update(chunk)
+            return digest.hexdigest()
+    except FileNotFoundError:
+        return None
+
+
+def _tail_digest(path: Path, offset: int) -> str:
+    """Digest of the bytes just before `offset`, to notice a history rewritten in place."""
+    start = max(0, offset - _TAIL_DIGEST_BYTES)
+    with path.open("rb") as f:
+        f.seek(start)
+        return hashlib.sha256(f.read(offset - start)).hexdigest()
+
+
+def _patterns_fingerprint(sensitive_patterns: list[re.Pattern[str]]) -> str:
+    return hashlib.sha256("\n".join(p.pattern for p in sensitive_patterns).encode()).hexdigest()
+
+
+def _load_state(path: Path) -> dict:
+    try:
+        state = json.loads(path.read_text(encoding="utf-8"))
+    except (FileNotFoundError, ValueError):
+        return {}
+    return state if isinstance(state, dict) and state.get("version") == _STATE_VERSION else {}
+
+
+def _resume_offset(state: dict, in_path: Path, out_path: Path, max_unique: int, fingerprint: str) -> int | None:
+    """Where the last export stopped reading `in_path`, or None if a full rebuild is needed.
+
+    Any change that could make the snapshot disagree with a full rebuild forces one:
+    a replaced, truncated or rewritten history, a hand-edited snapshot, or a different
+    --max-unique or pattern set.
+    """
+    if not state:
+        return None
+    try:
+        st = in_path.stat()
+    except FileNotFoundError:
+        return None
+    offset = state.get("offset")
+    if (
+        not isinstance(offset, int)
+        or state.get("inode") != st.st_ino
+        or st.st_size < state.get("size", 0)
+        or st.st_size < offset
+        or state.get("max_unique") != max_unique
+        or state.get("patterns") != fingerprint
+        or state.get("output_sha256") != _sha256_file(out_path)
+        or state.get("tail_sha256") != _tail_digest(in_path, offset)
+    ):
+        return None
+    return offset
+
+
+def _save_state(path: Path, state: dict) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.tmp")
+    tmp.write_text(json.dumps({"version": _STATE_VERSION, **state}, indent=2) + "\n", encoding="utf-8")
+    os.replace(tmp, path)
+
+
+_INDEX_VERSION = "1"
+_INDEX_BATCH = 20000
+
+_INDEX_SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE sources (
+    path TEXT PRIMARY KEY,
+    inode INTEGER NOT NULL,
+    offset INTEGER NOT NULL,
+    tail_sha256 TEXT NOT NULL
+);
+CREATE TABLE commands (
+    id INTEGER PRIMARY KEY,
+    command TEXT NOT NULL UNIQUE,
+    first_seen INTEGER NOT NULL,
+    last_seen INTEGER NOT NULL,
+    runs INTEGER NOT NULL,
+    total_duration INTEGER NOT NULL
+);
+CREATE VIRTUAL TABLE commands_fts USING fts5(
+    command, content='commands', content_rowid='id', tokenize="unicode61 tokenchars '-_.'"
+);
+"""
+
+# Rows are only ever inserted or have their counters bumped, so the FTS index
+# needs no update/delete triggers; a rebuild drops everything.
+_INDEX_FTS_TRIGGER = """
+CREATE TRIGGER commands_ai AFTER INSERT ON commands BEGIN
+    INSERT INTO commands_fts(rowid, command) VALUES (new.id, new.command);
+END
+"""
+
+_INDEX_UPSERT = """
+INSERT INTO commands (command, first_seen, last_seen, runs, total_duration) VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (command) DO UPDATE SET
+    first_seen = min(first_seen, excluded.first_seen),
+    last_seen = max(last_seen, excluded.last_seen),
+    runs = runs + excluded.runs,
+    total_duration = total_duration + excluded.total_duration
+"""
+
+
+def _default_index_path() -> Path:
+    return _default_export_path().with_name("history.db")
+
+
+def _reset_index(conn: sqlite3.Connection, fingerprint: str) -> None:
+    for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'commands_fts_%'").fetchall():
+        conn.execute(f'DROP TABLE IF EXISTS "{name}"')
+    conn.executescript(_INDEX_SCHEMA)
+    conn.executemany(
+        "INSERT INTO meta (key, value) VALUES (?, ?)", [("version", _INDEX_VERSION), ("patterns", fingerprint)]
+    )
+
+
+def _index_resume_offsets(conn: sqlite3.Connection, fingerprint: str) -> dict[str, int] | None:
+    """Per-source offsets the index has read up to, or None if it must be rebuilt."""
+    try:
+        meta = dict(conn.execute("SELECT key, value FROM meta"))
+        rows = conn.execute("SELECT path, inode, offset, tail_sha256 FROM sources").fetchall()
+    except sqlite3.DatabaseError:
+        return None
+    if meta.get("version") != _INDEX_VERSION or meta.get("patterns") != fingerprint:
+        return None
+    offsets: dict[str, int] = {}
+    for path, inode, offset, tail in rows:
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            continue
+        if st.st_ino != inode or st.st_size < offset or _tail_digest(Path(path), offset) != tail:
+            return None
+        offsets[path] = offset
+    return offsets
+
+
+def _flush_index_batch(conn: sqlite3.Connection, batch: dict[str, list[int]]) -> None:
+    conn.executemany(_INDEX_UPSERT, ((cmd, *stats) for cmd, stats in batch.items()))
+    batch.clear()
+
+
+def _update_index(
+    path: Path, sources: list[Path], matcher: _SensitiveMatcher, fingerprint: str, *, rebuild: bool = False
+) -> int:
+    """Fold the commands appended to `sources` since the last update into the index at `path`.
+
+    Each source's read offset and tail digest are kept in the database, like the
+    snapshot's state file; a rewritten source, a different pattern set or `rebuild`
+    rebuilds the whole index. Returns the number of history entries added.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path)
+    added = 0
+    try:
+        with conn:
+            offsets = None if rebuild else _index_resume_offsets(conn, fingerprint)
+            rebuilt = offsets is None
+            if offsets is None:
+                # Fill the FTS index in one pass at the end; per-row trigger inserts are ~2x slower.
+                _reset_index(conn, fingerprint)
+                offsets = {}
+            for source in sources:
+                if not source.exists():
+                    continue
+                key = str(source)
+                start = offsets.get(key, 0)
+                end = _dated_boundary(source, start, _command_boundary(source))
+                # command -> [first_seen, last_seen, runs, total_duration]
+                batch: dict[str, list[int]] = {}
+                for record in _iter_records(source, start, end):
+                    if matcher.verdict(record.command) is not None:
+                        continue
+                    added += 1
+                    stats = batch.get(record.command)
+                    if stats is None:
+                        batch[record.command] = [record.timestamp, record.timestamp, 1, record.duration]
+                    else:
+                        stats[0] = min(stats[0], record.timestamp)
+                        stats[1] = max(stats[1], record.timestamp)
+                        stats[2] += 1
+                        stats[3] += record.duration
+                    if len(batch) >= _INDEX_BATCH:
+                        _flush_index_batch(conn, batch)
+                _flush_index_batch(conn, batch)
+                conn.execute(
+                    "INSERT OR REPLACE INTO sources (path, inode, offset, tail_sha256) VALUES (?, ?, ?, ?)",
+                    (key, source.stat().st_ino, end, _tail_digest(source, end)),
+                )
+            if rebuilt:
+                conn.execute("INSERT INTO commands_fts (commands_fts) VALUES ('rebuild')")
+                conn.execute(_INDEX_FTS_TRIGGER)
+    finally:
+        conn.close()
+    return added
+
+
+def _recency_weight(age_s: float) -> float:
+    # zoxide's aging buckets: last hour, day, week, older.
+    if age_s < 3600:
+        return 4.0
+    if age_s < 86400:
+        return 2.0
+    if age_s < 604800:
+        return 0.5
+    return 0.25
+
+
+def _fts_query(terms: list[str]) -> str:
+    """Each term as a quoted prefix match; all must match."""
+    return " ".join('"' + term.replace('"', '""') + '"*' for term in terms)
+
+
+def _query_index(path: Path, terms: list[str], limit: int, now: float) -> list[tuple[int, int, str]]:
+    """(last_seen, runs, command) of the best matches for `terms`, best first.
+
+    FTS5's bm25 picks a candidate pool cheaply; the pool is then re-ranked by text
+    relevance scaled with a zoxide-style frecency (runs weighted by recency).
+    """
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        rows = conn.execute(
+            """
+            SELECT c.last_seen, c.runs, c.command, f.rank
+            FROM commands_fts AS f JOIN commands AS c ON c.id = f.rowid
+            WHERE commands_fts MATCH ?
+            ORDER BY f.rank
+            LIMIT ?
+            """,
+            (_fts_query(terms), max(limit * 20, 200)),
+        ).fetchall()
+    finally:
+        conn.close()
+
+    def score(row: tuple[int, int, str, float]) -> float:
+        last_seen, runs, _cmd, rank = row
+        frecency = runs * _recency_weight(now - last_seen)
+        return -rank * (1.0 + math.log1p(frecency))
+
+    rows.sort(key=score, reverse=True)
+    return [(last_seen, runs, cmd) for last_seen, runs, cmd, _rank in rows[:limit]]
+
+
+def _query_main(argv: list[str]) -> int:
+    parser = argparse.ArgumentParser(
+        prog=f"{Path(sys.argv[0]).name} query",
+        description="Search the history index written by --index, ranked by relevance and frecency.",
+    )
+    parser.add_argument("terms", nargs="+", help="Words (or word prefixes) that must all appear in the command.")
+    parser.add_argument(
+        "--index",
+        type=Path,
+        default=_default_index_path(),
+        help="History index path (default: ~/.dotfiles/history/history.db).",
+    )
+    parser.add_argument("--limit", type=int, default=20, help="Show at most this many matches (default: 20).")
+    args = parser.parse_args(argv)
+
+    index_path: Path = args.index.expanduser()
+    if not index_path.exists():
+        print(f"No history index at {index_path}; run an export with --index first.", file=sys.stderr)
+        return 1
+    try:
+        matches = _query_index(index_path, args.terms, args.limit, time.time())
+    except sqlite3.DatabaseError as exc:
+        print(f"Could not query {index_path}: {exc}", file=sys.stderr)
+        return 1
+    for last_seen, runs, cmd in matches:
+        print(f"{time.strftime('%Y-%m-%d %H:%M', time.localtime(last_seen))}  {runs:>5}x  {cmd}")
+    return 0
+
+
+def _default_zoxide_path() -> Path:
+    return Path.home() / ".dotfiles" / "zoxide" / "entries.tsv"
+
+
+# zoxide's defaults: _ZO_MAXAGE, and _ZO_EXCLUDE_DIRS=$HOME.
+_ZOXIDE_MAX_AGE = 10000
+_DIR_COMMANDS = {"cd", "pushd", "z"}
+_COMMAND_SEPARATORS_RE = re.compile(r"&&|\|\||[;|&]")
+
+
+class _Frecency:
+    """zoxide-style directory ranks: +1 per visit, all scaled down once their total passes `max_age`."""
+
+    def __init__(self, max_age: int = _ZOXIDE_MAX_AGE) -> None:
+        self.max_age = max_age
+        self.ranks: dict[str, float] = {}
+        self.last_seen: dict[str, int] = {}
+        self._total = 0.0
+
+    def add(self, path: str, timestamp: int) -> None:
+        self.ranks[path] = self.ranks.get(path, 0.0) + 1.0
+        self.last_seen[path] = max(self.last_seen.get(path, timestamp), timestamp)
+        self._total += 1.0
+        if self._total > self.max_age:
+            factor = 0.9 * self.max_age / self._total
+            for p in list(self.ranks):
+                rank = self.ranks[p] * factor
+                if rank < 1.0:
+                    del self.ranks[p], self.last_seen[p]
+                else:
+                    self.ranks[p] = rank
+            self._total = sum(self.ranks.values())
+
+    def top(self, k: int, now: float) -> list[tuple[float, str]]:
+        """The `k` highest (score, path) pairs, score as `zoxide query -s` would show it."""
+        scored = ((rank * _recency_weight(now - self.last_seen[p]), p) for p, rank in self.ranks.items())
+        return heapq.nlargest(k, scored) if k > 0 else sorted(scored, reverse=True)
+
+
+def _dir_commands(command: str) -> Iterator[list[str]]:
+    """argv of each cd/pushd/z in `command`, including ones chained with && ; ||."""
+    for segment in _COMMAND_SEPARATORS_RE.split(command):
+        try:
+            argv = shlex.split(segment)
+        except ValueError:
+            continue
+        while argv and argv[0] in ("builtin", "command"):
+            argv = argv[1:]
+        if argv and argv[0] in _DIR_COMMANDS:
+            yield argv
+
+
+def _resolve_dir(argv: list[str], cwd: str | None, oldpwd: str | None, home: str) -> str | None:
+    """Absolute directory `argv` changes to, or None when the history alone cannot tell."""
+    args = [a for a in argv[1:] if a == "-" or not a.startswith("-")]
+    if len(argv) > 1 and not args:
+        return None  # only flags, e.g. `z -i`
+    if not args:
+        return home if argv[0] != "pushd" else None
+    target = args[0]
+    if target == "-":
+        return oldpwd
+    if argv[0] == "z" and not (target.startswith(("/", "~", ".")) or "/" in target):
+        return None  # a keyword query, resolved against zoxide's own database
+    if target == "~" or target.startswith("~/"):
+        target = home + target[1:]
+    elif not target.startswith("/"):
+        if cwd is None:
+            return None
+        # Shells sharing one history interleave, so `cwd` may belong to another shell;
+        # only trust the guess if it names a directory that exists here.
+        target = os.path.normpath(os.path.join(cwd, target))
+        return target if os.path.isdir(target) else None
+    return os.path.normpath(target)
+
+
+def _derive_frecency(paths: list[Path], matcher: _SensitiveMatcher) -> _Frecency:
+    """One forward pass over each history, replaying cd/pushd/z to rank the directories visited.
+
+    Relative targets are resolved against the last known directory and kept only if
+    that directory exists; anything that cannot be resolved (a `z` keyword, a `popd`)
+    forgets it until the next absolute cd.
+    """
+    home = os.path.normpath(str(Path.home()))
+    frecency = _Frecency()
+    for path in paths:
+        cwd: str | None = None
+        oldpwd: str | None = None
+        for record in _iter_records(path):
+            if not any(word in record.command for word in _DIR_COMMANDS) and "popd" not in record.command:
+                continue
+            if matcher.verdict(record.command) is not None:
+                continue
+            for argv in _dir_commands(record.command):
+                target = _resolve_dir(argv, cwd, oldpwd, home)
+                if target is not None and target not in (home, "/"):
+                    frecency.add(target, record.timestamp)
+                cwd, oldpwd = target, cwd
+            if "popd" in record.command:
+                cwd = None
+    return frecency
+
+
+def _read_zoxide_entries(path: Path) -> dict[str, float]:
+    """Scores by path from an entries.tsv (`score<TAB>path`, `#` comments)."""
+    try:
+        text = path.read_text(encoding="utf-8")
+    except FileNotFoundError:
+        return {}
+    entries: dict[str, float] = {}
+    for line in text.splitlines():
+        if not line.strip() or line.startswith("#"):
+            continue
+        score, sep, entry_path = line.partition("\t")
+        if not sep:
+            score, _, entry_path = line.strip().partition(" ")
+        # Older exports repeated zoxide's padded score in the path column ("620.0\t 620.0 /path").
+        m = re.fullmatch(r"\s*[0-9.]+\s+(/.*)", entry_path)
+        if m:
+            entry_path = m.group(1)
+        try:
+            entries[entry_path.strip()] = float(score)
+        except ValueError:
+            continue
+    return entries
+
+
+def _seed_zoxide(tsv: Path, paths: list[Path], matcher: _SensitiveMatcher, top: int) -> tuple[int, bool]:
+    """Merge the `top` directories derived from `paths` into `tsv`, keeping the higher score per path.
+
+    Returns (directories derived, whether the file changed).
+    """
+    derived = _derive_frecency(paths, matcher).top(top, time.time())
+    entries = _read_zoxide_entries(tsv)
+    for score, path in derived:
+        entries[path] = max(entries.get(path, 0.0), round(score, 1))
+    # Plain `score<TAB>path` rows only; a `#` header from export.sh is not carried over.
+    lines = [f"{score:.1f}\t{path}" for path, score in sorted(entries.items(), key=lambda kv: (-kv[1], kv[0]))]
+    return len(derived), _write_lines(tsv, lines, backup=False)
+
+
+def _encoded_lines(lines: Iterable[str]) -> Iterator[bytes]:
+    for line in lines:
+        yield f"{line}\n".encode("utf-8")
+
+
+def _fsync_dir(path: Path) -> None:
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _replace_atomically(path: Path, chunks: Iterable[bytes], *, mode_from: Path | None = None) -> None:
+    """Stream `chunks` to a temp file beside `path`, fsync it, and rename it over `path`."""
+    tmp = path.with_name(f".{path.name}.tmp-{os.getpid()}")
+    try:
+        with tmp.open("wb") as f:
+            f.writelines(chunks)
+            f.flush()
+            os.fsync(f.fileno())
+        if mode_from is not None and mode_from.exists():
+            shutil.copymode(mode_from, tmp)
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    _fsync_dir(path.parent)
+
+
+def _backup_snapshot(path: Path, keep: int) -> None:
+    """Keep a copy of `path` named by its content hash, then prune all but the `keep` newest.
+
+    Backing up content that already has a copy only refreshes that copy's mtime, so
+    identical snapshots are stored once. keep=0 keeps every backup.
+    """
+    digest = _sha256_file(path)
+    if digest is None:
+        return
+    backup_path = path.with_name(f"{path.name}.bak-{digest[:16]}")
+    if not backup_path.exists():
+        with path.open("rb") as src:
+            _replace_atomically(backup_path, iter(lambda: src.read(1 << 20), b""))
+    os.utime(backup_path)
+    if keep <= 0:
+        return
+    backups = sorted(
+        path.parent.glob(f"{glob.escape(path.name)}.bak-*"), key=lambda p: p.stat().st_mtime, reverse=True
+    )
+    for old in backups[keep:]:
+        old.unlink(missing_ok=True)
+
+
+def _write_lines(path: Path, lines: list[str], *, backup: bool, keep_backups: int = 10) -> bool:
+    """Atomically replace `path` with `lines`, one per line.
+
+    Returns False, leaving the file (and its mtime) untouched, when it already holds
+    exactly this content.
+    """
+    digest = hashlib.sha256()
+    for chunk in _encoded_lines(lines):
+        digest.update(chunk)
+    if _sha256_file(path) == digest.hexdigest():
+        return False
     path.parent.mkdir(parents=True, exist_ok=True)
     if backup and path.exists():
-        ts = time.strftime("%Y%m%d-%H%M%S")
-        backup_path = path.with_name(f"{path.name}.bak-{ts}")
-        shutil.copy2(path, backup_path)
-    data = "\n".join(lines) + ("\n" if lines else "")
-    path.write_text(data, encoding="utf-8")
+        _backup_snapshot(path, keep_backups)
+    _replace_atomically(path, _encoded_lines(lines), mode_from=path)
+    return True
+
+
+_STATS_VERSION = 1
+
+
+def _fmt_bytes(n: int | None) -> str:
+    if n is None:
+        return "-"
+    for unit, scale in (("GB", 1 << 30), ("MB", 1 << 20), ("KB", 1 << 10)):
+        if n >= scale:
+            return f"{n / scale:.1f} {unit}"
+    return f"{n} B"
+
+
+def _print_profile(report: dict, out: TextIO) -> None:
+    wall_s = report["wall_s"]
+    memory = f"max RSS {_fmt_bytes(report['max_rss_bytes'])}"
+    if report["peak_bytes"] is not None:
+        memory += f", peak {_fmt_bytes(report['peak_bytes'])} traced"
+    print(
+        f"profile: {wall_s:.3f}s wall, {report['lines']} lines ({report['lines_per_s'] or 0:.0f} lines/s), {memory}",
+        file=out,
+    )
+    print(f"  {'stage':<14}{'wall':>10}{'share':>8}{'items':>10}{'peak':>11}", file=out)
+    for name, stage in report["stages"].items():
+        share = stage["wall_s"] / wall_s if wall_s > 0 else 0.0
+        print(
+            f"  {name:<14}{stage['wall_s']:>9.3f}s{share:>8.0%}{stage['items']:>10}{_fmt_bytes(stage['peak_bytes']):>11}",
+            file=out,
+        )
+    print(f"  continuation merges: {report['continuation_merges']}", file=out)
+    print(f"  dropped: {report['dropped']}", file=out)
+    for reason, hits in report["dropped_by_pattern"].items():
+        print(f"    {hits:>6}  {reason}", file=out)
+    print(f"  duplicates removed: {report['duplicates_removed']}", file=out)
 
 
 def main(argv: list[str]) -> int:
+    if argv[:1] == ["query"]:
+        return _query_main(argv[1:])
+
     parser = argparse.ArgumentParser(
         description=(
             "Export a sanitized, git-trackable shell history snapshot.\n\n"
             "Reads zsh history,\n"
             "filters out lines that look like they contain secrets, de-duplicates, and\n"
             "writes a bounded-size snapshot into ~/.dotfiles/history/.\n\n"
-            "NOTE: Always review before committing."
+            "NOTE: Always review before committing.\n\n"
+            "`query TERMS...` searches the --index database instead."
         ),
         formatter_class=argparse.RawTextHelpFormatter,
     )
     parser.add_argument(
         "--in",
-        dest="in_path",
-        type=Path,
-        default=_default_shell_history_path(),
-        help="Input history path (default: ~/.zsh_history).",
+        dest="in_specs",
+        nargs="+",
+        default=[str(_default_shell_history_path())],
+        metavar="PATH",
+        help=(
+            "Input history files or globs (default: ~/.zsh_history).\n"
+            "Several sources (other machines, *.bak-* snapshots) are merged by timestamp,\n"
+            "most recent wins; merged exports are always full rebuilds."
+        ),
     )
     parser.add_argument(
         "--out",
@@ -146,34 +1154,257 @@ def main(argv: list[str]) -> int:
         action="store_true",
         help="Print counts only; do not write.",
     )
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="Re-read the whole history instead of only what was appended since the last export.",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help=(
+            "Scan commands for secrets in this many worker processes (default: 1; 0 = one per CPU).\n"
+            "Histories too small to benefit are still scanned serially, as is a newest-first\n"
+            "export that stops after --max-unique commands (use with --max-unique 0 or --dry-run)."
+        ),
+    )
+    parser.add_argument(
+        "--index",
+        nargs="?",
+        type=Path,
+        const=_default_index_path(),
+        default=None,
+        metavar="DB",
+        help=(
+            "Also keep a searchable SQLite index of the sanitized commands with timestamps,\n"
+            "durations and run counts (default DB: ~/.dotfiles/history/history.db)."
+        ),
+    )
+    parser.add_argument(
+        "--zoxide",
+        nargs="?",
+        type=Path,
+        const=_default_zoxide_path(),
+        default=None,
+        metavar="TSV",
+        help=(
+            "Also derive zoxide frecency scores from cd/pushd/z in the history and merge\n"
+            "them into TSV, keeping the higher score per directory\n"
+            "(default TSV: ~/.dotfiles/zoxide/entries.tsv)."
+        ),
+    )
+    parser.add_argument(
+        "--zoxide-top",
+        type=int,
+        default=500,
+        metavar="K",
+        help="With --zoxide, merge only the K best derived directories (default: 500; 0 = all).",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help=(
+            "Print wall time per stage (read, parse, sanitize, recent_unique, write),\n"
+            "lines/s, max RSS and drop/duplicate counters. Profiling slows the run, so\n"
+            "compare profiles with each other, not with plain runs."
+        ),
+    )
+    parser.add_argument(
+        "--trace-memory",
+        action="store_true",
+        help="With --profile/--stats, also record each stage's peak memory via tracemalloc (much slower).",
+    )
+    parser.add_argument(
+        "--stats",
+        type=Path,
+        metavar="PATH",
+        help="Write the --profile numbers as JSON to PATH ('-' for stdout; status lines then go to stderr).",
+    )
     parser.add_argument(
         "--backup",
         action="store_true",
-        help="Create a timestamped backup before overwriting the output file.",
+        help=(
+            "Back up the output file before overwriting it; each distinct content is\n"
+            "stored once, as <out>.bak-<sha256 prefix>."
+        ),
+    )
+    parser.add_argument(
+        "--keep-backups",
+        type=int,
+        default=10,
+        help="With --backup, keep only this many most recent backups (default: 10). Use 0 to keep all.",
     )
     args = parser.parse_args(argv)
 
-    in_path: Path = args.in_path.expanduser()
+    in_paths = _expand_sources(args.in_specs)
+    if not in_paths:
+        parser.error("no input history files")
+    in_path = in_paths[0]
     out_path: Path = args.out_path.expanduser()
 
-    normalized = _read_commands(in_path)
-
     sensitive_patterns = _compile_sensitive_patterns()
-    safe = [c for c in normalized if not _looks_sensitive(c, sensitive_patterns)]
-    exported = _recent_unique(safe, args.max_unique)
+    matcher = _SensitiveMatcher(sensitive_patterns)
+    counts = {"commands": 0, "dropped": 0}
+    jobs = args.jobs if args.jobs > 0 else os.cpu_count() or 1
+    profile = _Profile(trace_memory=args.trace_memory) if args.profile or args.stats else None
+    # `--stats -` keeps stdout for the JSON report alone.
+    status = sys.stderr if args.stats is not None and str(args.stats) == "-" else sys.stdout
+
+    def timed(name: str, items: Iterable[str]) -> Iterable[str]:
+        return items if profile is None else profile.stage(name, items)
+
+    def block(name: str):
+        return nullcontext() if profile is None else profile.block(name)
+
+    def dedup_input(items: Iterable[str]) -> Iterable[str]:
+        return items if profile is None else profile.count("dedup_input", items)
+
+    def finish(mode: str, exported: list[str]) -> int:
+        if profile is None:
+            return 0
+        report = {
+            "version": _STATS_VERSION,
+            "mode": mode,
+            "inputs": [str(p) for p in in_paths],
+            **profile.to_dict(),
+            "commands": counts["commands"],
+            "continuation_merges": profile.counters.get("continuation_merges", 0),
+            "dropped": counts["dropped"],
+            "dropped_by_pattern": dict(sorted(matcher.hits.items(), key=lambda kv: kv[1], reverse=True)),
+            "duplicates_removed": profile.counters.get("dedup_input", 0) - len(exported),
+            "exported": len(exported),
+        }
+        if args.profile:
+            _print_profile(report, status)
+        if args.stats is not None:
+            data = json.dumps(report, indent=2) + "\n"
+            if str(args.stats) == "-":
+                sys.stdout.write(data)
+            else:
+                args.stats.expanduser().write_text(data, encoding="utf-8")
+        return 0
+
+    def sanitized(commands: Iterable[str], nbytes: int) -> Iterator[str]:
+        if jobs > 1 and nbytes >= _PARALLEL_MIN_BYTES:
+            # Closing this generator (e.g. once --max-unique is reached) shuts the pool down.
+            with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker) as executor:
+                yield from sanitized(_prescanned(commands, matcher, executor, lookahead=2 * jobs), 0)
+            return
+        for cmd in commands:
+            counts["commands"] += 1
+            if matcher.reason(cmd) is not None:
+                counts["dropped"] += 1
+                continue
+            yield cmd
+
+    def newest_first(paths: list[Path]) -> Iterable[str]:
+        if len(paths) == 1:
+            return _iter_commands_reversed(paths[0], profile=profile)
+        return (record.command for record in _merge_newest_first(paths, profile))
+
+    total_size = sum(p.stat().st_size for p in in_paths if p.exists())
+    # A newest-first export stops once --max-unique commands are kept, usually long
+    # before a pool's lookahead would pay off; only an unbounded one reads everything.
+    reads_all = args.max_unique <= 0
 
     if args.dry_run:
-        print(f"in:  {in_path} ({len(normalized)} commands)")
-        print(f"out: {out_path}")
-        print(f"kept: {len(exported)} unique commands")
-        dropped = len(normalized) - len(safe)
+        # Counts cover the whole history, so drain what the dedup stage leaves unread.
+        safe = timed("sanitize", sanitized(newest_first(in_paths), total_size))
+        with block("recent_unique"):
+            exported = _recent_unique(dedup_input(safe), args.max_unique)
+        for _ in safe:
+            pass
+        print(f"in:  {', '.join(map(str, in_paths))} ({counts['commands']} commands)", file=status)
+        print(f"out: {out_path}", file=status)
+        print(f"kept: {len(exported)} unique commands", file=status)
+        dropped = counts["dropped"]
         if dropped:
-            print(f"dropped (sensitive/too-long): {dropped}")
-        return 0
+            print(f"dropped (sensitive/too-long): {dropped}", file=status)
+            for reason, hits in sorted(matcher.hits.items(), key=lambda kv: kv[1], reverse=True):
+                print(f"  {hits:>6}  {reason}", file=status)
+        return finish("dry-run", exported)
 
-    _write_lines(out_path, exported, backup=args.backup)
-    print(f"Wrote: {out_path} ({len(exported)} unique commands)")
-    return 0
+    fingerprint = _patterns_fingerprint(sensitive_patterns)
+
+    def seed_zoxide() -> None:
+        if args.zoxide is None:
+            return
+        tsv: Path = args.zoxide.expanduser()
+        with block("zoxide"):
+            derived, changed = _seed_zoxide(tsv, in_paths, matcher, args.zoxide_top)
+        print(f"{'Wrote' if changed else 'Unchanged'}: {tsv} ({derived} directories from history)", file=status)
+
+    def update_index() -> None:
+        if args.index is None:
+            return
+        index_path: Path = args.index.expanduser()
+        with block("index"):
+            added = _update_index(index_path, in_paths, matcher, fingerprint, rebuild=args.full)
+        print(f"Indexed: {index_path} (+{added} commands)", file=status)
+
+    if len(in_paths) > 1:
+        safe = timed("sanitize", sanitized(newest_first(in_paths), total_size if reads_all else 0))
+        with block("recent_unique"):
+            exported = _recent_unique(dedup_input(safe), args.max_unique)
+        with block("write"):
+            written = _write_lines(out_path, exported, backup=args.backup, keep_backups=args.keep_backups)
+        # The merged snapshot no longer tracks any single history.
+        _state_path(out_path).unlink(missing_ok=True)
+        verb = "Wrote" if written else "Unchanged"
+        print(f"{verb}: {out_path} ({len(exported)} unique commands from {len(in_paths)} histories)", file=status)
+        update_index()
+        seed_zoxide()
+        return finish("merged", exported)
+
+    state_path = _state_path(out_path)
+    end = _command_boundary(in_path) if in_path.exists() else 0
+    start = None if args.full else _resume_offset(_load_state(state_path), in_path, out_path, args.max_unique, fingerprint)
+
+    if start is not None:
+        # Merge the appended commands into the previous snapshot, most recent wins.
+        new = list(timed("sanitize", sanitized(_iter_commands(in_path, start, end, profile), end - start)))
+        with block("read"):
+            # Split on "\n" only: a command may contain \r, U+2028 or other splitlines() separators.
+            with out_path.open(encoding="utf-8", newline="") as f:
+                previous = f.read().split("\n")
+            if previous[-1] == "":
+                previous.pop()
+        with block("recent_unique"):
+            exported = _recent_unique(dedup_input(reversed(previous + new)), args.max_unique)
+    else:
+        # Newest first, so the dedup stage can stop reading once --max-unique is reached.
+        safe = timed("sanitize", sanitized(_iter_commands_reversed(in_path, end, profile), end if reads_all else 0))
+        with block("recent_unique"):
+            exported = _recent_unique(dedup_input(safe), args.max_unique)
+
+    with block("write"):
+        written = _write_lines(out_path, exported, backup=args.backup, keep_backups=args.keep_backups)
+    if in_path.exists():
+        _save_state(
+            state_path,
+            {
+                "input": str(in_path),
+                "inode": in_path.stat().st_ino,
+                "size": end,
+                "offset": end,
+                "tail_sha256": _tail_digest(in_path, end),
+                "max_unique": args.max_unique,
+                "patterns": fingerprint,
+                "output_sha256": _sha256_file(out_path),
+            },
+        )
+    verb = "Wrote" if written else "Unchanged"
+    if start is not None:
+        print(
+            f"{verb}: {out_path} ({len(exported)} unique commands, {counts['commands']} new since last export)",
+            file=status,
+        )
+    else:
+        print(f"{verb}: {out_path} ({len(exported)} unique commands)", file=status)
+    update_index()
+    seed_zoxide()
+    return finish("incremental" if start is not None else "full", exported)
 
 
 if __name__ == "__main__":